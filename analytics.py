@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from aiogram.types import Message
+
+from query_log import connect
+from tenants import TenantPath
+
+DB_PATH = TenantPath("data.db")
+
+STAT_KINDS = ("registrations", "cancellations", "unsubscribes")
+STATS_DAYS = 7
+STATS_EVENTS_LIMIT = 20
+
+
+def record_stat(event_id: int, kind: str):
+    # Счётчики обновляются инкрементально в момент действия,
+    # поэтому для отчёта не нужно сканировать logs и registrations
+    if kind not in STAT_KINDS:
+        raise ValueError(kind)
+    today = datetime.now().strftime("%Y-%m-%d")
+    conn = connect(DB_PATH)
+    with conn:
+        conn.execute(
+            f"""
+            INSERT INTO event_stats (event_id, {kind}) VALUES (?, 1)
+            ON CONFLICT(event_id) DO UPDATE SET {kind} = {kind} + 1
+            """,
+            (event_id,),
+        )
+        conn.execute(
+            f"""
+            INSERT INTO daily_stats (stat_date, {kind}) VALUES (?, 1)
+            ON CONFLICT(stat_date) DO UPDATE SET {kind} = {kind} + 1
+            """,
+            (today,),
+        )
+    conn.close()
+
+
+def get_future_event_stats():
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT e.name, e.event_date, e.event_time,
+               s.registrations, s.cancellations, s.unsubscribes
+        FROM event_stats s
+        JOIN events e ON e.event_id = s.event_id
+        WHERE e.is_deleted = 0
+          AND date(e.event_date) >= date('now')
+        ORDER BY e.event_date, e.event_time
+        LIMIT ?
+        """,
+        (STATS_EVENTS_LIMIT,),
+    )
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def get_daily_stats(days: int = STATS_DAYS):
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT stat_date, registrations, cancellations, unsubscribes
+        FROM daily_stats
+        WHERE stat_date >= date('now', 'localtime', ?)
+        ORDER BY stat_date DESC
+        """,
+        (f"-{days - 1} days",),
+    )
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def format_cancel_rate(registrations: int, cancellations: int, unsubscribes: int) -> str:
+    if not registrations:
+        return "—"
+    return f"{(cancellations + unsubscribes) / registrations:.0%}"
+
+
+def build_stats_text() -> str:
+    lines = [f"📊 Статистика за {STATS_DAYS} дней"]
+    daily = get_daily_stats()
+    if daily:
+        for stat_date, registrations, cancellations, unsubscribes in daily:
+            lines.append(f"• {stat_date}: +{registrations} / −{cancellations + unsubscribes}")
+        totals = [sum(row[i] for row in daily) for i in (1, 2, 3)]
+        lines.append(
+            f"Итого: регистраций {totals[0]}, отмен {totals[1]}, отписок {totals[2]}, "
+            f"доля отмен {format_cancel_rate(*totals)}"
+        )
+    else:
+        lines.append("Действий пока не было.")
+
+    events = get_future_event_stats()
+    if events:
+        lines.append("\n🎬 Будущие ивенты")
+        for name, date_str, time_str, registrations, cancellations, unsubscribes in events:
+            lines.append(
+                f"• {name} ({date_str} {time_str}): регистраций {registrations}, "
+                f"отмен {cancellations}, отписок {unsubscribes}, "
+                f"доля отмен {format_cancel_rate(registrations, cancellations, unsubscribes)}"
+            )
+    return "\n".join(lines)
+
+
+async def show_stats(message: Message):
+    await message.answer(build_stats_text())
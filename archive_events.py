@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import shutil
+from datetime import datetime
+
+from query_log import connect
+from tenants import TenantPath
+
+DB_PATH = TenantPath("data.db")
+PICS_DIR = TenantPath("pics")
+ARCHIVE_PICS_DIR = TenantPath("pics", "archive")
+TICKETS_DIR = TenantPath("tickets")
+
+ARCHIVE_BATCH_SIZE = 100
+ARCHIVE_CHECK_INTERVAL_SECONDS = 60 * 60
+# True — афиши прошедших ивентов переносятся в pics/archive, False — удаляются
+ARCHIVE_POSTERS = True
+
+
+def get_table_columns(cursor, table: str) -> list[str]:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def archive_batch(conn) -> list[int]:
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT event_id FROM events
+        WHERE date(event_date) < date('now')
+        ORDER BY event_id
+        LIMIT ?
+        """,
+        (ARCHIVE_BATCH_SIZE,),
+    )
+    event_ids = [row[0] for row in cursor.fetchall()]
+    if not event_ids:
+        return []
+
+    placeholders = ", ".join("?" for _ in event_ids)
+    archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Пачка переносится целиком в одной транзакции: либо всё, либо ничего
+    with conn:
+        for table, archive_table in (
+            ("tickets", "tickets_archive"),
+            ("registrations", "registrations_archive"),
+            ("events", "events_archive"),
+        ):
+            columns = ", ".join(get_table_columns(cursor, table))
+            cursor.execute(
+                f"""
+                INSERT INTO {archive_table} ({columns}, archived_at)
+                SELECT {columns}, ? FROM {table} WHERE event_id IN ({placeholders})
+                """,
+                (archived_at, *event_ids),
+            )
+        # Серии берут афишу с исходного ивента — переводим их на ближайший живой экземпляр
+        cursor.execute(
+            f"""
+            UPDATE event_series
+            SET source_event_id = (
+                SELECT MIN(e.event_id) FROM events e
+                WHERE e.series_id = event_series.series_id
+                  AND date(e.event_date) >= date('now')
+            )
+            WHERE source_event_id IN ({placeholders})
+            """,
+            event_ids,
+        )
+        cursor.execute(f"DELETE FROM tickets WHERE event_id IN ({placeholders})", event_ids)
+        cursor.execute(f"DELETE FROM registrations WHERE event_id IN ({placeholders})", event_ids)
+        cursor.execute(f"DELETE FROM events WHERE event_id IN ({placeholders})", event_ids)
+    return event_ids
+
+
+def archive_posters(event_ids: list[int]):
+    for event_id in event_ids:
+        poster_path = PICS_DIR / f"{event_id}.png"
+        if not poster_path.exists():
+            continue
+        if ARCHIVE_POSTERS:
+            ARCHIVE_PICS_DIR.mkdir(parents=True, exist_ok=True)
+            shutil.move(poster_path, ARCHIVE_PICS_DIR / poster_path.name)
+        else:
+            poster_path.unlink()
+
+
+def remove_ticket_images(event_ids: list[int]):
+    # QR-картинки после ивента не нужны, сами билеты остаются в tickets_archive
+    for event_id in event_ids:
+        shutil.rmtree(TICKETS_DIR / str(event_id), ignore_errors=True)
+
+
+def archive_past_events() -> int:
+    conn = connect(DB_PATH)
+    archived = 0
+    try:
+        while True:
+            event_ids = archive_batch(conn)
+            if not event_ids:
+                break
+            archive_posters(event_ids)
+            remove_ticket_images(event_ids)
+            archived += len(event_ids)
+    finally:
+        conn.close()
+    return archived
+
+
+async def archive_loop():
+    last_run_date = None
+    while True:
+        today = datetime.now().date()
+        if last_run_date != today:
+            try:
+                archived = await asyncio.to_thread(archive_past_events)
+                if archived:
+                    logging.info("Перенесено в архив ивентов: %s", archived)
+                last_run_date = today
+            except Exception:
+                logging.exception("Ошибка при архивации ивентов")
+        await asyncio.sleep(ARCHIVE_CHECK_INTERVAL_SECONDS)
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import gzip
+import logging
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from tenants import TenantPath, current_tenant, get_tenant_by_name
+
+DB_PATH = TenantPath("data.db")
+BACKUP_DIR = TenantPath("backups")
+
+BACKUP_INTERVAL_HOURS = 24
+BACKUP_KEEP_DAYS = 7
+BACKUP_RETRY_MINUTES = 60
+
+
+def check_integrity(path: Path):
+    conn = sqlite3.connect(path)
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if result != "ok":
+        raise RuntimeError(f"Проверка целостности {path.name} не пройдена: {result}")
+
+
+def list_backups() -> list[Path]:
+    return sorted(BACKUP_DIR.glob("data-*.db.gz"))
+
+
+def rotate_backups():
+    # По возрасту, а не по числу файлов: перезапуски бота не вытесняют недельную историю.
+    # Самый свежий бэкап остаётся всегда
+    cutoff = time.time() - BACKUP_KEEP_DAYS * 24 * 60 * 60
+    for path in list_backups()[:-1]:
+        if path.stat().st_mtime < cutoff:
+            path.unlink()
+
+
+def seconds_until_next_backup() -> float:
+    backups = list_backups()
+    if not backups:
+        return 0.0
+    due_at = backups[-1].stat().st_mtime + BACKUP_INTERVAL_HOURS * 60 * 60
+    return max(0.0, due_at - time.time())
+
+
+def make_backup() -> Path:
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    snapshot_path = BACKUP_DIR / f".data-{stamp}.db"
+    archive_path = BACKUP_DIR / f"data-{stamp}.db.gz"
+
+    source = sqlite3.connect(DB_PATH)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        # Одним шагом: при пошаговом копировании любая запись бота
+        # из другого соединения начинает бэкап заново
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        check_integrity(snapshot_path)
+        with snapshot_path.open("rb") as src, gzip.open(archive_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    finally:
+        snapshot_path.unlink(missing_ok=True)
+
+    rotate_backups()
+    return archive_path
+
+
+def restore_backup(archive_path: Path):
+    # Восстанавливать нужно при остановленном боте
+    snapshot_path = BACKUP_DIR / f".restore-{archive_path.name.removesuffix('.gz')}"
+    with gzip.open(archive_path, "rb") as src, snapshot_path.open("wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    try:
+        check_integrity(snapshot_path)
+        source = sqlite3.connect(snapshot_path)
+        target = sqlite3.connect(DB_PATH)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    finally:
+        snapshot_path.unlink(missing_ok=True)
+
+
+async def backup_loop():
+    # Срок следующего бэкапа считаем от последнего сохранённого, а не от запуска бота
+    while True:
+        await asyncio.sleep(seconds_until_next_backup())
+        try:
+            path = await asyncio.to_thread(make_backup)
+            logging.info("Бэкап БД сохранён: %s", path.name)
+        except Exception:
+            logging.exception("Ошибка при создании бэкапа БД")
+            await asyncio.sleep(BACKUP_RETRY_MINUTES * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бэкапы data.db")
+    parser.add_argument("--tenant", default="main", help="площадка из tenants.json")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("backup", help="сделать бэкап сейчас")
+    subparsers.add_parser("list", help="показать сохранённые бэкапы")
+    restore_parser = subparsers.add_parser("restore", help="восстановить data.db из бэкапа")
+    restore_parser.add_argument("file", type=Path)
+    args = parser.parse_args()
+    current_tenant.set(get_tenant_by_name(args.tenant))
+
+    if args.command == "backup":
+        print(f"Бэкап сохранён: {make_backup()}")
+    elif args.command == "list":
+        for backup_path in list_backups():
+            print(backup_path.name)
+    elif args.command == "restore":
+        path = args.file if args.file.exists() else BACKUP_DIR / args.file
+        restore_backup(path)
+        print(f"data.db восстановлена из {path.name}")
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import (
+    ClientDecodeError,
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import GetUpdates, TelegramMethod
+
+API_MAX_ATTEMPTS = 4
+API_BACKOFF_BASE_SECONDS = 0.5
+API_BACKOFF_MAX_SECONDS = 10.0
+# Дольше ждать flood control внутри вызова нет смысла — пусть решает вызывающий код
+API_MAX_RETRY_AFTER_SECONDS = 30
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+# Повтор этих методов ничего не дублирует: чтение, правка, удаление, ответ на callback
+IDEMPOTENT_PREFIXES = ("get", "edit", "delete", "answer", "set", "pin", "unpin")
+
+# Виды ошибок Bot API
+FLOOD = "flood"
+NETWORK = "network"
+SERVER = "server"
+UNREACHABLE = "unreachable"
+NOT_MODIFIED = "not_modified"
+BAD_REQUEST = "bad_request"
+OTHER = "other"
+# После этих ошибок запрос мог и не дойти до Telegram — есть смысл повторить
+TRANSIENT_ERRORS = (NETWORK, SERVER)
+
+
+class CircuitOpenError(TelegramNetworkError):
+    # Наследник TelegramNetworkError: код, который уже ловит сетевые ошибки, обработает и этот случай
+    def __init__(self, method: TelegramMethod, retry_in: float):
+        super().__init__(method=method, message=f"Bot API недоступен, следующая попытка через {retry_in:.0f} с")
+
+
+def classify_error(error: Exception) -> str:
+    if isinstance(error, TelegramRetryAfter):
+        return FLOOD
+    if isinstance(error, TelegramNetworkError):
+        return NETWORK
+    # ClientDecodeError — вместо JSON пришла HTML-страница 5xx от Telegram или прокси
+    if isinstance(error, (TelegramServerError, ClientDecodeError)):
+        return SERVER
+    if isinstance(error, TelegramForbiddenError):
+        return UNREACHABLE
+    if isinstance(error, TelegramBadRequest):
+        message = error.message.lower()
+        if "message is not modified" in message:
+            return NOT_MODIFIED
+        if "chat not found" in message or "user is deactivated" in message:
+            return UNREACHABLE
+        return BAD_REQUEST
+    return OTHER
+
+
+def is_idempotent(method: TelegramMethod) -> bool:
+    # send* при сетевой ошибке мог уже дойти до пользователя — повтор дал бы дубль
+    return method.__api_method__.startswith(IDEMPOTENT_PREFIXES)
+
+
+def get_backoff_delay(attempt: int) -> float:
+    # Экспоненциальная задержка с full jitter, чтобы повторы разных вызовов не шли залпом
+    return random.uniform(0, min(API_BACKOFF_MAX_SECONDS, API_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class CircuitBreaker:
+    # closed — вызовы идут как обычно; open — после серии сбоев сразу отказываем;
+    # half-open — по истечении паузы пропускаем один пробный вызов
+    def __init__(self, threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def end_probe(self):
+        # Пробный вызов мог завершиться чем угодно, включая отмену, — следующий
+        # вызов в half-open должен снова получить право на пробу
+        self._probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        # True — автомат только что разомкнулся
+        self.failures += 1
+        was_open = self.opened_at is not None
+        if self._probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self._probing = False
+            return not was_open
+        return False
+
+
+class BotApiStats:
+    def __init__(self):
+        self.calls = 0
+        self.retries: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.failed_methods: Counter[str] = Counter()
+        self.breaker_trips = 0
+        self.short_circuited = 0
+
+    def reset(self):
+        self.__init__()
+
+
+class ResilientRequestMiddleware(BaseRequestMiddleware):
+    # Request-middleware сессии: через неё проходят все исходящие вызовы всех ботов,
+    # включая message.answer, edit_caption, bot.send_message и т.п.
+    def __init__(self, max_attempts: int = API_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self.breaker = CircuitBreaker()
+        self.stats = BotApiStats()
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        # У long polling свой цикл повторов в aiogram
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+
+        self.stats.calls += 1
+        name = method.__api_method__
+        attempt = 0
+        while True:
+            probe = self.breaker.state == "half-open"
+            if not self.breaker.allow():
+                self.stats.short_circuited += 1
+                raise CircuitOpenError(method, self.breaker.retry_in())
+            try:
+                response = await make_request(bot, method)
+            except (TelegramAPIError, ClientDecodeError) as error:
+                kind = classify_error(error)
+                self.stats.errors[kind] += 1
+                if kind in TRANSIENT_ERRORS:
+                    self._record_failure()
+                else:
+                    # Telegram ответил — значит, API живой
+                    self.breaker.record_success()
+
+                attempt += 1
+                delay = self._get_retry_delay(kind, error, method, attempt)
+                if delay is None:
+                    if kind in TRANSIENT_ERRORS or kind == FLOOD:
+                        self.stats.failed_methods[name] += 1
+                    raise
+                self.stats.retries[name] += 1
+                logging.info("%s: %s, повтор %s через %.1f с", name, kind, attempt, delay)
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self.stats.errors[OTHER] += 1
+                self.stats.failed_methods[name] += 1
+                self._record_failure()
+                raise
+            finally:
+                if probe:
+                    self.breaker.end_probe()
+
+            self.breaker.record_success()
+            return response
+
+    def _record_failure(self):
+        if self.breaker.record_failure():
+            self.stats.breaker_trips += 1
+            logging.warning("Bot API деградировал, вызовы приостановлены на %.0f с", self.breaker.reset_seconds)
+
+    def _get_retry_delay(self, kind: str, error: TelegramAPIError, method: TelegramMethod, attempt: int) -> float | None:
+        if attempt >= self.max_attempts:
+            return None
+        if kind == FLOOD:
+            # При 429 запрос точно не выполнен — повторять можно любой метод
+            if error.retry_after > API_MAX_RETRY_AFTER_SECONDS:
+                return None
+            return error.retry_after + random.uniform(0, 1)
+        if kind in TRANSIENT_ERRORS and is_idempotent(method):
+            return get_backoff_delay(attempt)
+        return None
+
+
+api_middleware = ResilientRequestMiddleware()
+
+
+def build_api_report() -> str:
+    stats = api_middleware.stats
+    breaker = api_middleware.breaker
+    lines = [
+        "📡 Вызовы Bot API",
+        f"Всего: {stats.calls}, повторов: {sum(stats.retries.values())}",
+        f"Автомат: {breaker.state}, срабатываний: {stats.breaker_trips}, отклонено: {stats.short_circuited}",
+    ]
+    if stats.errors:
+        lines.append("Ошибки: " + ", ".join(f"{kind} {count}" for kind, count in stats.errors.most_common()))
+    if stats.retries:
+        lines.append("Повторы: " + ", ".join(f"{name} {count}" for name, count in stats.retries.most_common(5)))
+    if stats.failed_methods:
+        lines.append("Не удалось: " + ", ".join(f"{name} {count}" for name, count in stats.failed_methods.most_common(5)))
+    return "\n".join(lines)
+
+
+def reset_api_stats():
+    api_middleware.stats.reset()
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from aiogram import Bot, Router
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+
+from bot_api import CircuitOpenError, api_middleware
+from participant_events import is_unreachable_chat_error, set_user_active
+from query_log import connect
+from tenants import TenantLocal, TenantPath
+
+DB_PATH = TenantPath("data.db")
+router = Router()
+
+BROADCAST_RATE_PER_SECOND = 20
+BROADCAST_CONCURRENCY = 5
+BROADCAST_PAGE_SIZE = 200
+BROADCAST_MAX_RETRIES = 3
+BROADCAST_PROGRESS_INTERVAL_SECONDS = 5
+_running_broadcasts = TenantLocal(set)
+
+
+class BroadcastStates(StatesGroup):
+    text = State()
+
+
+broadcast_confirm_kb = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="✅ Отправить", callback_data="broadcast_confirm")],
+    [InlineKeyboardButton(text="❌ Отмена", callback_data="broadcast_cancel")],
+])
+
+
+# --------------------------------------------------
+# Работа с БД
+# --------------------------------------------------
+
+def create_broadcast(text: str, admin_chat_id: int) -> int:
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO broadcasts (text, admin_chat_id, created_at)
+        VALUES (?, ?, ?)
+        """,
+        (text, admin_chat_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+    )
+    broadcast_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return broadcast_id
+
+
+def get_broadcast(broadcast_id: int):
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT broadcast_id, text, admin_chat_id, status_message_id, status,
+               last_user_id, sent_count, failed_count
+        FROM broadcasts
+        WHERE broadcast_id = ?
+        """,
+        (broadcast_id,),
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+def get_running_broadcast_ids() -> list[int]:
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT broadcast_id FROM broadcasts WHERE status = 'running' ORDER BY broadcast_id")
+    rows = cursor.fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+def set_broadcast_status_message(broadcast_id: int, message_id: int):
+    conn = connect(DB_PATH)
+    conn.execute(
+        "UPDATE broadcasts SET status_message_id = ? WHERE broadcast_id = ?",
+        (message_id, broadcast_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def save_broadcast_progress(broadcast_id: int, last_user_id: int, sent: int, failed: int, status: str = "running"):
+    conn = connect(DB_PATH)
+    conn.execute(
+        """
+        UPDATE broadcasts
+        SET last_user_id = ?, sent_count = ?, failed_count = ?, status = ?
+        WHERE broadcast_id = ?
+        """,
+        (last_user_id, sent, failed, status, broadcast_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def count_broadcast_recipients(after_user_id: int = 0) -> int:
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM users WHERE active = 1 AND user_id > ?", (after_user_id,))
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+def iter_broadcast_recipients(after_user_id: int):
+    # Получателей читаем страницами по user_id: память постоянна,
+    # а читающая транзакция не держит блокировку БД всю рассылку
+    while True:
+        conn = connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT user_id FROM users
+            WHERE active = 1 AND user_id > ?
+            ORDER BY user_id
+            LIMIT ?
+            """,
+            (after_user_id, BROADCAST_PAGE_SIZE),
+        )
+        page = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        if not page:
+            return
+        yield from page
+        after_user_id = page[-1]
+
+
+# --------------------------------------------------
+# Отправка
+# --------------------------------------------------
+
+async def send_broadcast_message(bot: Bot, user_id: int, text: str) -> bool:
+    for _ in range(BROADCAST_MAX_RETRIES):
+        try:
+            await bot.send_message(user_id, text, parse_mode="HTML")
+            return True
+        except TelegramRetryAfter as error:
+            await asyncio.sleep(error.retry_after)
+        except CircuitOpenError:
+            # Запрос не уходил в Telegram — ждём, пока API оживёт, и пробуем снова
+            await asyncio.sleep(api_middleware.breaker.retry_in() + 1)
+        except (TelegramForbiddenError, TelegramBadRequest) as error:
+            if is_unreachable_chat_error(error):
+                set_user_active(user_id, False)
+            return False
+        except (TelegramNetworkError, TelegramServerError) as error:
+            # Сообщение могло и дойти — не повторяем, чтобы не прислать дважды;
+            # сбой одного получателя не должен обрывать всю рассылку
+            logging.warning("Рассылка: не удалось отправить пользователю %s: %s", user_id, error)
+            return False
+        except Exception:
+            logging.exception("Рассылка: ошибка при отправке пользователю %s", user_id)
+            return False
+    return False
+
+
+def format_broadcast_progress(sent: int, failed: int, remaining: int, status: str) -> str:
+    title = {
+        "running": "📣 Рассылка идёт…",
+        "done": "✅ Рассылка завершена",
+    }.get(status, "📣 Рассылка")
+    return f"{title}\n\nОтправлено: {sent}\nНе доставлено: {failed}\nОсталось: {remaining}"
+
+
+async def update_broadcast_status(bot: Bot, broadcast_row, sent: int, failed: int, remaining: int, status: str):
+    status_message_id = broadcast_row[3]
+    if not status_message_id:
+        return
+    try:
+        await bot.edit_message_text(
+            format_broadcast_progress(sent, failed, remaining, status),
+            chat_id=broadcast_row[2],
+            message_id=status_message_id,
+        )
+    except TelegramBadRequest:
+        pass
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int):
+    if broadcast_id in _running_broadcasts:
+        return
+    _running_broadcasts.add(broadcast_id)
+    try:
+        broadcast_row = get_broadcast(broadcast_id)
+        if broadcast_row is None or broadcast_row[4] != "running":
+            return
+
+        text, last_user_id, sent, failed = broadcast_row[1], broadcast_row[5], broadcast_row[6], broadcast_row[7]
+        remaining = count_broadcast_recipients(last_user_id)
+        last_progress = 0.0
+
+        recipients = iter_broadcast_recipients(last_user_id)
+        while True:
+            batch = [user_id for _, user_id in zip(range(BROADCAST_CONCURRENCY), recipients)]
+            if not batch:
+                break
+
+            started = time.monotonic()
+            results = await asyncio.gather(*(send_broadcast_message(bot, user_id, text) for user_id in batch))
+            sent += sum(results)
+            failed += len(results) - sum(results)
+            remaining = max(0, remaining - len(batch))
+
+            # Чекпоинт после каждой пачки — после перезапуска продолжим отсюда
+            save_broadcast_progress(broadcast_id, batch[-1], sent, failed)
+
+            if time.monotonic() - last_progress >= BROADCAST_PROGRESS_INTERVAL_SECONDS:
+                last_progress = time.monotonic()
+                await update_broadcast_status(bot, broadcast_row, sent, failed, remaining, "running")
+
+            min_duration = len(batch) / BROADCAST_RATE_PER_SECOND
+            elapsed = time.monotonic() - started
+            if elapsed < min_duration:
+                await asyncio.sleep(min_duration - elapsed)
+
+        last_user_id = get_broadcast(broadcast_id)[5]
+        save_broadcast_progress(broadcast_id, last_user_id, sent, failed, status="done")
+        await update_broadcast_status(bot, broadcast_row, sent, failed, 0, "done")
+        logging.info("Рассылка %s завершена: отправлено %s, не доставлено %s", broadcast_id, sent, failed)
+    except Exception:
+        logging.exception("Ошибка рассылки %s", broadcast_id)
+    finally:
+        _running_broadcasts.discard(broadcast_id)
+
+
+async def resume_broadcasts(bot: Bot):
+    for broadcast_id in get_running_broadcast_ids():
+        logging.info("Продолжаем рассылку %s", broadcast_id)
+        asyncio.create_task(run_broadcast(bot, broadcast_id))
+
+
+# --------------------------------------------------
+# Хендлеры
+# --------------------------------------------------
+
+async def start_broadcast(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("📣 Отправьте текст рассылки для всех активных пользователей:")
+    await state.set_state(BroadcastStates.text)
+
+
+@router.message(BroadcastStates.text)
+async def broadcast_text(message: Message, state: FSMContext):
+    if not message.text:
+        await message.answer("⚠️ Отправьте текст сообщения.")
+        return
+
+    await state.update_data(text=message.html_text)
+    recipients = count_broadcast_recipients()
+    await message.answer(
+        f"{message.html_text}\n\n— Получателей: {recipients}. Отправляем?",
+        reply_markup=broadcast_confirm_kb,
+        parse_mode="HTML",
+    )
+
+
+@router.callback_query(lambda c: c.data == "broadcast_confirm")
+async def broadcast_confirm(call: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    text = data.get("text")
+    await state.clear()
+    if not text:
+        await call.answer("Текст рассылки не найден", show_alert=True)
+        return
+
+    broadcast_id = create_broadcast(text, call.message.chat.id)
+    status_message = await call.message.answer(
+        format_broadcast_progress(0, 0, count_broadcast_recipients(), "running")
+    )
+    set_broadcast_status_message(broadcast_id, status_message.message_id)
+    asyncio.create_task(run_broadcast(call.bot, broadcast_id))
+    await call.answer("Рассылка запущена")
+
+
+@router.callback_query(lambda c: c.data == "broadcast_cancel")
+async def broadcast_cancel(call: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await call.message.answer("❌ Рассылка отменена.")
+    await call.answer()
@@ -1,13 +1,15 @@
-import sqlite3
 from aiogram import Router
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
 from datetime import datetime
-from pathlib import Path
 
-DB_PATH = Path(__file__).resolve().parent / "data.db"
-PICS_DIR = Path(__file__).resolve().parent / "pics"
+from event_catalog import catalog
+from query_log import connect
+from tenants import TenantPath
+
+DB_PATH = TenantPath("data.db")
+PICS_DIR = TenantPath("pics")
 router = Router()
 
 DASH_SYMBOLS = {"-", "—", "–", "−", "‑"}
@@ -30,7 +32,7 @@ cancel_button = InlineKeyboardMarkup(inline_keyboard=[
 
 # --- Получение последнего ивента для автозаполнения ---
 def get_last_event():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("SELECT address, max_participants, price, event_time FROM events ORDER BY event_id DESC LIMIT 1")
     row = cursor.fetchone()
@@ -39,7 +41,7 @@ def get_last_event():
 
 # --- Сохраняем новый ивент ---
 def save_event(data: dict) -> int:
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
         INSERT INTO events (name, description, price, address, max_participants, event_date, event_time)
@@ -56,9 +58,58 @@ def save_event(data: dict) -> int:
     event_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    catalog.upsert((
+        event_id,
+        data['name'],
+        data['description'],
+        data['price'],
+        data['address'],
+        data['max_participants'],
+        data['date'],
+        data['time'],
+    ))
     return event_id
 
 
+# --- Проверки значений (общие для мастера и массового импорта) ---
+def parse_price(text: str) -> float:
+    price = float(str(text).strip().replace(",", "."))
+    if price < 0:
+        raise ValueError
+    return price
+
+
+def parse_max_participants(text: str) -> int:
+    max_participants = int(str(text).strip())
+    if max_participants <= 0:
+        raise ValueError
+    return max_participants
+
+
+def parse_event_date(text: str) -> str:
+    text = str(text).strip()
+    now = datetime.now()
+    for date_format in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            dt = datetime.strptime(text, date_format)
+        except ValueError:
+            continue
+        if dt.date() < now.date():
+            raise ValueError
+        return dt.strftime("%Y-%m-%d")
+
+    day, month = map(int, text.split("."))
+    year = now.year
+    dt = datetime(year, month, day)
+    if dt.date() < now.date():
+        dt = datetime(year + 1, month, day)
+    return dt.strftime("%Y-%m-%d")
+
+
+def parse_event_time(text: str) -> str:
+    return datetime.strptime(str(text).strip(), "%H:%M").strftime("%H:%M")
+
+
 def is_skip_poster(text: str) -> bool:
     stripped = text.strip()
     if not stripped:
@@ -109,9 +160,7 @@ async def event_price(message: Message, state: FSMContext):
         price = last[2]
     else:
         try:
-            price = float(message.text)
-            if price < 0:
-                raise ValueError
+            price = parse_price(message.text)
         except ValueError:
             await message.answer("⚠️ Введите корректную цену (число ≥ 0). Попробуйте снова:", reply_markup=cancel_button)
             return
@@ -154,9 +203,7 @@ async def event_max(message: Message, state: FSMContext):
         max_participants = int(last[1])
     else:
         try:
-            max_participants = int(message.text)
-            if max_participants <= 0:
-                raise ValueError
+            max_participants = parse_max_participants(message.text)
         except ValueError:
             await message.answer("⚠️ Введите целое положительное число:", reply_markup=cancel_button)
             return
@@ -166,16 +213,8 @@ async def event_max(message: Message, state: FSMContext):
 
 @router.message(EventStates.date)
 async def event_date(message: Message, state: FSMContext):
-    text = message.text.strip()
     try:
-        day, month = map(int, text.split("."))
-        now = datetime.now()
-        year = now.year
-        dt = datetime(year, month, day)
-        if dt.date() < now.date():
-            dt = datetime(year + 1, month, day)
-        date_str = dt.strftime("%Y-%m-%d")
-
+        date_str = parse_event_date(message.text)
     except Exception:
         await message.answer("⚠️ Неверный формат даты. Используйте DD.MM:", reply_markup=cancel_button)
         return
@@ -199,8 +238,7 @@ async def event_time(message: Message, state: FSMContext):
         time_str = last[3]
     else:
         try:
-            datetime.strptime(message.text.strip(), "%H:%M")
-            time_str = message.text.strip()
+            time_str = parse_event_time(message.text)
         except ValueError:
             await message.answer("⚠️ Неверный формат времени. Используйте HH:MM:", reply_markup=cancel_button)
             return
@@ -1,8 +1,8 @@
 import sqlite3
-from pathlib import Path
 
-BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "data.db"
+from tenants import TENANTS, TenantPath, current_tenant
+
+DB_PATH = TenantPath("data.db")
 
 
 def add_notification_column():
@@ -21,5 +21,241 @@ def add_notification_column():
     conn.close()
 
 
+def add_event_series():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS event_series (
+            series_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_event_id INTEGER,
+            name TEXT,
+            description TEXT,
+            price REAL,
+            address TEXT,
+            max_participants INTEGER,
+            start_date TEXT NOT NULL,
+            event_time TEXT NOT NULL,
+            interval_weeks INTEGER NOT NULL DEFAULT 1,
+            is_active INTEGER NOT NULL DEFAULT 1
+        )
+        """
+    )
+
+    cursor.execute("PRAGMA table_info(events)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "series_id" not in columns:
+        cursor.execute("ALTER TABLE events ADD COLUMN series_id INTEGER")
+        print("Добавлено поле series_id в events")
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_events_series_date ON events (series_id, event_date)"
+    )
+    conn.commit()
+    print("Таблица event_series готова")
+
+    conn.close()
+
+
+def add_broadcasts_table():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            broadcast_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            admin_chat_id INTEGER NOT NULL,
+            status_message_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'running',
+            last_user_id INTEGER NOT NULL DEFAULT 0,
+            sent_count INTEGER NOT NULL DEFAULT 0,
+            failed_count INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.commit()
+    print("Таблица broadcasts готова")
+
+    conn.close()
+
+
+def add_events_search():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            name, description, address,
+            content='events',
+            content_rowid='event_id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    # Триггеры держат индекс в синхронизации с таблицей events
+    cursor.executescript(
+        """
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, name, description, address)
+            VALUES (new.event_id, new.name, new.description, new.address);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, name, description, address)
+            VALUES ('delete', old.event_id, old.name, old.description, old.address);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS events_fts_update
+        AFTER UPDATE OF name, description, address ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, name, description, address)
+            VALUES ('delete', old.event_id, old.name, old.description, old.address);
+            INSERT INTO events_fts (rowid, name, description, address)
+            VALUES (new.event_id, new.name, new.description, new.address);
+        END;
+        """
+    )
+    cursor.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+    conn.commit()
+    print("Полнотекстовый индекс events_fts готов")
+
+    conn.close()
+
+
+def add_analytics_tables():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS event_stats (
+            event_id INTEGER PRIMARY KEY,
+            registrations INTEGER NOT NULL DEFAULT 0,
+            cancellations INTEGER NOT NULL DEFAULT 0,
+            unsubscribes INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            stat_date TEXT PRIMARY KEY,
+            registrations INTEGER NOT NULL DEFAULT 0,
+            cancellations INTEGER NOT NULL DEFAULT 0,
+            unsubscribes INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    # Стартовые значения по уже существующим регистрациям
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO event_stats (event_id, registrations)
+        SELECT event_id, COUNT(*) FROM registrations GROUP BY event_id
+        """
+    )
+    conn.commit()
+    print("Таблицы статистики готовы")
+
+    conn.close()
+
+
+def add_tickets_table():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    # token — подписанный HMAC идентификатор билета, по нему же ищем при чек-ине
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            token TEXT PRIMARY KEY,
+            event_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            user_name TEXT,
+            user_nickname TEXT,
+            created_at TEXT NOT NULL,
+            file_id TEXT,
+            checked_in_at TEXT,
+            checked_in_by INTEGER,
+            UNIQUE (event_id, user_id)
+        )
+        """
+    )
+    conn.commit()
+    print("Таблица tickets готова")
+
+    conn.close()
+
+
+def sync_archive_table(cursor, table: str, archive_table: str):
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {archive_table} AS SELECT * FROM {table} WHERE 0")
+
+    # Колонки, добавленные в основную таблицу после создания архива
+    cursor.execute(f"PRAGMA table_info({table})")
+    source_columns = [(row[1], row[2]) for row in cursor.fetchall()]
+    cursor.execute(f"PRAGMA table_info({archive_table})")
+    archive_columns = {row[1] for row in cursor.fetchall()}
+    for name, column_type in source_columns:
+        if name not in archive_columns:
+            cursor.execute(f"ALTER TABLE {archive_table} ADD COLUMN {name} {column_type}")
+    if "archived_at" not in archive_columns:
+        cursor.execute(f"ALTER TABLE {archive_table} ADD COLUMN archived_at TEXT")
+
+
+def add_archive_tables():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    sync_archive_table(cursor, "events", "events_archive")
+    sync_archive_table(cursor, "registrations", "registrations_archive")
+    sync_archive_table(cursor, "tickets", "tickets_archive")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_archive_id ON events_archive (event_id)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_registrations_archive_event ON registrations_archive (event_id)"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_archive_event ON tickets_archive (event_id)")
+    conn.commit()
+    print("Архивные таблицы готовы")
+
+    conn.close()
+
+
+def clone_schema(source_path, target_path):
+    # Новая площадка получает пустую БД с той же схемой, что и основная
+    source = sqlite3.connect(source_path)
+    rows = source.execute(
+        """
+        SELECT type, name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END
+        """
+    ).fetchall()
+    source.close()
+
+    # Служебные таблицы FTS5 создаются вместе с виртуальной таблицей
+    virtual_tables = [name for _, name, sql in rows if sql.upper().startswith("CREATE VIRTUAL TABLE")]
+    target = sqlite3.connect(target_path)
+    for _, name, sql in rows:
+        if any(name.startswith(f"{table}_") for table in virtual_tables):
+            continue
+        target.execute(sql)
+    target.commit()
+    target.close()
+
+
 if __name__ == "__main__":
-    add_notification_column()
+    main_db_path = TENANTS[0].data_dir / "data.db"
+    for tenant in TENANTS:
+        current_tenant.set(tenant)
+        print(f"--- Площадка {tenant.name} ---")
+        if tenant is not TENANTS[0] and not DB_PATH.exists():
+            tenant.data_dir.mkdir(parents=True, exist_ok=True)
+            clone_schema(main_db_path, DB_PATH)
+            print("Создана БД по схеме основной площадки")
+
+        add_notification_column()
+        add_event_series()
+        add_broadcasts_table()
+        add_events_search()
+        add_analytics_tables()
+        add_tickets_table()
+        add_archive_tables()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import bisect
+from datetime import datetime, timezone
+
+from query_log import connect
+from tenants import TenantLocal, TenantPath
+
+DB_PATH = TenantPath("data.db")
+
+EVENT_COLUMNS = """
+    event_id, name, description, price, address,
+    max_participants, event_date, event_time
+"""
+
+
+def _sort_key(event_row) -> tuple:
+    return event_row[6], event_row[7], event_row[0]
+
+
+def _today() -> str:
+    # SQL-запросы бота фильтруют по date('now'), то есть по UTC — держимся того же
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+# Будущие ивенты в памяти, отсортированные по дате и времени начала
+class EventCatalog:
+    def __init__(self):
+        self._events: dict[int, tuple] = {}
+        self._keys: list[tuple] = []
+        self._loaded_for: str | None = None
+        self.version = 0
+
+    # --- Загрузка и актуальность ---
+
+    def reload(self):
+        conn = connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {EVENT_COLUMNS}
+            FROM events
+            WHERE is_deleted = 0
+              AND date(event_date) >= date('now')
+        """)
+        rows = cursor.fetchall()
+        conn.close()
+
+        self._events = {row[0]: row for row in rows}
+        self._keys = sorted(_sort_key(row) for row in rows)
+        self._loaded_for = _today()
+        self.version += 1
+
+    def _ensure_fresh(self):
+        today = _today()
+        if self._loaded_for is None:
+            self.reload()
+        elif self._loaded_for != today:
+            # Наступили новые сутки — прошедшие ивенты выпадают без запроса к БД
+            expired = [key for key in self._keys if key[0] < today]
+            for key in expired:
+                self._events.pop(key[2], None)
+            self._keys = self._keys[len(expired):]
+            self._loaded_for = today
+            self.version += 1
+
+    # --- Чтение ---
+
+    def get(self, event_id: int):
+        self._ensure_fresh()
+        return self._events.get(event_id)
+
+    def future_events(self, limit: int | None = None) -> list[tuple]:
+        self._ensure_fresh()
+        keys = self._keys[:limit] if limit else self._keys
+        return [self._events[key[2]] for key in keys]
+
+    def adjacent(self, event_row, direction: str):
+        # Работает и для ивента, которого уже нет в каталоге: ищем по его ключу
+        self._ensure_fresh()
+        key = _sort_key(event_row)
+        if direction == "next":
+            index = bisect.bisect_right(self._keys, key)
+        else:
+            index = bisect.bisect_left(self._keys, key) - 1
+        if 0 <= index < len(self._keys):
+            return self._events[self._keys[index][2]]
+        return None
+
+    def position(self, event_row) -> tuple[int, int]:
+        self._ensure_fresh()
+        index = bisect.bisect_left(self._keys, _sort_key(event_row))
+        return index + 1, len(self._keys)
+
+    # --- Запись (write-through) ---
+
+    def upsert(self, event_row):
+        self._ensure_fresh()
+        self._discard(event_row[0])
+        if event_row[6] >= self._loaded_for:
+            self._events[event_row[0]] = event_row
+            bisect.insort(self._keys, _sort_key(event_row))
+        self.version += 1
+
+    def remove(self, event_id: int):
+        self._ensure_fresh()
+        self._discard(event_id)
+        self.version += 1
+
+    def refresh(self, event_id: int):
+        event_row = load_event(event_id)
+        if event_row is None:
+            self.remove(event_id)
+        else:
+            self.upsert(event_row)
+
+    def _discard(self, event_id: int):
+        event_row = self._events.pop(event_id, None)
+        if event_row is not None:
+            index = bisect.bisect_left(self._keys, _sort_key(event_row))
+            del self._keys[index]
+
+
+def load_event(event_id: int):
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {EVENT_COLUMNS}
+        FROM events
+        WHERE event_id = ? AND is_deleted = 0
+    """, (event_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+catalog = TenantLocal(EventCatalog)
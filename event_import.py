@@ -0,0 +1,265 @@
+import csv
+import io
+import re
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
+
+from create_event import (
+    get_last_event,
+    parse_event_date,
+    parse_event_time,
+    parse_max_participants,
+    parse_price,
+)
+from event_catalog import catalog
+from query_log import connect
+from tenants import TenantPath
+
+DB_PATH = TenantPath("data.db")
+router = Router()
+
+MAX_IMPORT_BYTES = 1024 * 1024
+MAX_REPORT_ERRORS = 30
+CSV_COLUMNS = ["name", "description", "price", "address", "max_participants", "date", "time"]
+ICS_PRICE_PREFIX = "Цена:"
+ICS_ESCAPE_RE = re.compile(r"\\([\\;,nN])")
+
+
+class ImportStates(StatesGroup):
+    file = State()
+
+
+class SemicolonDialect(csv.excel):
+    delimiter = ";"
+
+
+cancel_import_button = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="❌ Отмена", callback_data="cancel_import")]
+])
+
+
+# --------------------------------------------------
+# Разбор файлов
+# --------------------------------------------------
+
+def parse_csv_events(content: str) -> list[tuple[int, dict]]:
+    try:
+        dialect = csv.Sniffer().sniff(content[:4096], delimiters=";,\t")
+    except csv.Error:
+        dialect = SemicolonDialect
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    if reader.fieldnames:
+        reader.fieldnames = [field.strip().lower() for field in reader.fieldnames]
+    # Строка 1 — заголовок
+    return [(line_number, row) for line_number, row in enumerate(reader, start=2)]
+
+
+def _unfold_ics_lines(content: str) -> list[str]:
+    lines: list[str] = []
+    for line in content.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        else:
+            lines.append(line)
+    return lines
+
+
+def _unescape_ics_text(value: str) -> str:
+    return ICS_ESCAPE_RE.sub(lambda match: "\n" if match.group(1) in "nN" else match.group(1), value)
+
+
+def parse_ics_events(content: str) -> list[tuple[int, dict]]:
+    last = get_last_event()
+    default_max = last[1] if last else None
+
+    events = []
+    current: dict | None = None
+    event_number = 0
+    for line in _unfold_ics_lines(content):
+        if line == "BEGIN:VEVENT":
+            event_number += 1
+            current = {}
+            continue
+        if line == "END:VEVENT" and current is not None:
+            events.append((event_number, _ics_event_to_row(current, default_max)))
+            current = None
+            continue
+        if current is None or ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        name, *params = key.split(";")
+        current[name.upper()] = value
+        # Параметры свойства (DTSTART;TZID=Europe/Moscow) — отдельными ключами «DTSTART;TZID»
+        for param in params:
+            param_name, _, param_value = param.partition("=")
+            current[f"{name.upper()};{param_name.upper()}"] = param_value.strip('"')
+    return events
+
+
+def _ics_event_to_row(properties: dict, default_max) -> dict:
+    row = {
+        "name": _unescape_ics_text(properties.get("SUMMARY", "")),
+        "address": _unescape_ics_text(properties.get("LOCATION", "")),
+        "max_participants": properties.get("X-MAX-PARTICIPANTS", default_max),
+        "price": "",
+        "date": "",
+        "time": "",
+    }
+
+    # Цену ищем в описании — в таком виде её пишет build_event_ics
+    description_lines = []
+    for line in _unescape_ics_text(properties.get("DESCRIPTION", "")).split("\n"):
+        if line.startswith(ICS_PRICE_PREFIX):
+            row["price"] = line[len(ICS_PRICE_PREFIX):].strip()
+        else:
+            description_lines.append(line)
+    row["description"] = "\n".join(description_lines).strip()
+
+    dtstart = properties.get("DTSTART", "")
+    if dtstart:
+        try:
+            start_dt = datetime.strptime(dtstart.removesuffix("Z"), "%Y%m%dT%H%M%S")
+        except ValueError:
+            start_dt = None
+        if start_dt:
+            start_dt = _to_local_time(start_dt, dtstart.endswith("Z"), properties.get("DTSTART;TZID"), row)
+            row["date"] = start_dt.strftime("%Y-%m-%d")
+            row["time"] = start_dt.strftime("%H:%M")
+        else:
+            row["date"] = dtstart
+    return row
+
+
+def _to_local_time(start_dt: datetime, is_utc: bool, tzid: str | None, row: dict) -> datetime:
+    # Ивенты хранятся в местном времени бота; время в UTC («…Z») и с TZID переводим в него
+    if is_utc:
+        start_dt = start_dt.replace(tzinfo=timezone.utc)
+    elif tzid:
+        try:
+            start_dt = start_dt.replace(tzinfo=ZoneInfo(tzid))
+        except (ZoneInfoNotFoundError, ValueError):
+            # Молча сдвигать время нельзя — отклоняем ивент
+            row["error"] = f"неизвестный часовой пояс {tzid}"
+            return start_dt
+    else:
+        return start_dt
+    return start_dt.astimezone().replace(tzinfo=None)
+
+
+def validate_event_row(row: dict) -> dict:
+    # Те же правила, что и в пошаговом мастере создания ивента
+    if row.get("error"):
+        raise ValueError(row["error"])
+    values = {}
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("нет названия")
+    values["name"] = name
+    values["description"] = (row.get("description") or "").strip()
+    values["address"] = (row.get("address") or "").strip()
+
+    checks = [
+        ("price", parse_price, "неверная цена"),
+        ("max_participants", parse_max_participants, "неверное количество участников"),
+        ("date", parse_event_date, "неверная дата"),
+        ("time", parse_event_time, "неверное время"),
+    ]
+    for field, parse, error in checks:
+        try:
+            values[field] = parse(row.get(field))
+        except (TypeError, ValueError):
+            raise ValueError(error)
+    return values
+
+
+def save_events_bulk(events: list[dict]) -> int:
+    conn = connect(DB_PATH)
+    try:
+        # Одна транзакция на весь файл
+        with conn:
+            conn.executemany("""
+                INSERT INTO events (name, description, price, address, max_participants, event_date, event_time)
+                VALUES (:name, :description, :price, :address, :max_participants, :date, :time)
+            """, events)
+    finally:
+        conn.close()
+    catalog.reload()
+    return len(events)
+
+
+def build_import_report(saved: int, rejected: list[tuple[int, str]], unit: str) -> str:
+    lines = [f"✅ Добавлено ивентов: {saved}"]
+    if rejected:
+        lines.append(f"⚠️ Отклонено: {len(rejected)}")
+        for number, error in rejected[:MAX_REPORT_ERRORS]:
+            lines.append(f"• {unit} {number}: {error}")
+        if len(rejected) > MAX_REPORT_ERRORS:
+            lines.append(f"… и ещё {len(rejected) - MAX_REPORT_ERRORS}")
+    return "\n".join(lines)
+
+
+# --------------------------------------------------
+# Хендлеры
+# --------------------------------------------------
+
+async def start_import(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer(
+        "📥 Отправьте файл .csv или .ics с ивентами.\n\n"
+        "Колонки CSV: " + ";".join(CSV_COLUMNS) + "\n"
+        "Дата — DD.MM, DD.MM.YYYY или YYYY-MM-DD, время — HH:MM.",
+        reply_markup=cancel_import_button,
+    )
+    await state.set_state(ImportStates.file)
+
+
+@router.message(ImportStates.file)
+async def import_file(message: Message, state: FSMContext):
+    document = message.document
+    if document is None:
+        await message.answer("⚠️ Отправьте файл .csv или .ics.", reply_markup=cancel_import_button)
+        return
+
+    filename = (document.file_name or "").lower()
+    if not filename.endswith((".csv", ".ics")):
+        await message.answer("⚠️ Поддерживаются только файлы .csv и .ics.", reply_markup=cancel_import_button)
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_BYTES:
+        await message.answer("⚠️ Файл слишком большой.", reply_markup=cancel_import_button)
+        return
+
+    buffer = await message.bot.download(document)
+    try:
+        content = buffer.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        await message.answer("⚠️ Файл должен быть в кодировке UTF-8.", reply_markup=cancel_import_button)
+        return
+
+    if filename.endswith(".ics"):
+        rows, unit = parse_ics_events(content), "Ивент"
+    else:
+        rows, unit = parse_csv_events(content), "Строка"
+
+    accepted = []
+    rejected = []
+    for number, row in rows:
+        try:
+            accepted.append(validate_event_row(row))
+        except ValueError as error:
+            rejected.append((number, str(error)))
+
+    saved = save_events_bulk(accepted) if accepted else 0
+    await message.answer(build_import_report(saved, rejected, unit))
+    await state.clear()
+
+
+@router.callback_query(lambda c: c.data == "cancel_import")
+async def cancel_import(call: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await call.message.answer("❌ Импорт ивентов отменён.")
+    await call.answer()
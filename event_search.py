@@ -0,0 +1,85 @@
+import re
+
+from aiogram import Router
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup, State
+from aiogram.types import Message
+
+from participant_events import build_event_card, send_event_message
+from query_log import connect
+from tenants import ADMINS, TenantPath
+from view_event_admin import build_admin_event_text, event_main_kb, send_event_info
+
+DB_PATH = TenantPath("data.db")
+router = Router()
+
+SEARCH_RESULTS_LIMIT = 5
+# Вес совпадений в bm25: название важнее адреса, адрес важнее описания
+SEARCH_WEIGHTS = (10.0, 1.0, 2.0)
+
+
+class SearchStates(StatesGroup):
+    query = State()
+
+
+def build_fts_query(text: str) -> str | None:
+    # Каждое слово ищем по префиксу: «интер» найдёт «Интерстеллар»
+    tokens = re.findall(r"\w+", text.lower())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def search_events(text: str, limit: int = SEARCH_RESULTS_LIMIT):
+    fts_query = build_fts_query(text)
+    if fts_query is None:
+        return []
+
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT e.event_id, e.name, e.description, e.price, e.address,
+               e.max_participants, e.event_date, e.event_time
+        FROM events_fts
+        JOIN events e ON e.event_id = events_fts.rowid
+        WHERE events_fts MATCH ?
+          AND e.is_deleted = 0
+          AND date(e.event_date) >= date('now')
+        ORDER BY bm25(events_fts, ?, ?, ?)
+        LIMIT ?
+        """,
+        (fts_query, *SEARCH_WEIGHTS, limit),
+    )
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+async def start_search(message: Message, state: FSMContext):
+    await state.clear()
+    await message.answer("🔎 Введите название, адрес или слово из описания ивента:")
+    await state.set_state(SearchStates.query)
+
+
+@router.message(lambda msg: msg.text == "Поиск ивентов")
+async def participant_search(message: Message, state: FSMContext):
+    await start_search(message, state)
+
+
+@router.message(SearchStates.query)
+async def search_query(message: Message, state: FSMContext):
+    await state.clear()
+    events = search_events(message.text or "")
+    if not events:
+        await message.answer("🤷 Ничего не нашлось.")
+        return
+
+    is_admin = message.from_user.id in ADMINS
+    for event_row in events:
+        event_id = event_row[0]
+        if is_admin:
+            await send_event_info(message, build_admin_event_text(event_row), event_id, event_main_kb(event_id))
+        else:
+            text, keyboard, _ = build_event_card(event_row, message.from_user.id)
+            await send_event_message(message, event_id, text, keyboard)
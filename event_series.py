@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import shutil
+from datetime import date, datetime, timedelta
+
+from aiogram import Router
+from aiogram.types import CallbackQuery
+
+from event_catalog import catalog
+from query_log import connect
+from tenants import TenantPath
+from view_event_admin import EDIT_FIELDS, event_edit_kb, get_event_series_id, get_poster_path
+
+DB_PATH = TenantPath("data.db")
+router = Router()
+
+SERIES_HORIZON_WEEKS = 8
+SERIES_CHECK_INTERVAL_SECONDS = 60 * 60
+# Поля, которые можно распространить на всю серию (дата у каждого экземпляра своя)
+SERIES_FIELDS = {"name", "description", "price", "address", "max_participants", "event_time"}
+
+
+# --------------------------------------------------
+# Работа с БД
+# --------------------------------------------------
+
+def series_dates(start_date: date, interval_weeks: int, today: date, horizon_end: date) -> list[str]:
+    step = timedelta(weeks=interval_weeks)
+    current = start_date
+    if current < today:
+        skipped = (today - current).days // step.days
+        current += step * skipped
+        if current < today:
+            current += step
+    dates = []
+    while current <= horizon_end:
+        dates.append(current.strftime("%Y-%m-%d"))
+        current += step
+    return dates
+
+
+def materialize_series(series_id: int | None = None) -> int:
+    today = datetime.now().date()
+    horizon_end = today + timedelta(weeks=SERIES_HORIZON_WEEKS)
+
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    query = """
+        SELECT series_id, source_event_id, name, description, price, address,
+               max_participants, start_date, event_time, interval_weeks
+        FROM event_series
+        WHERE is_active = 1
+    """
+    if series_id is not None:
+        cursor.execute(query + " AND series_id = ?", (series_id,))
+    else:
+        cursor.execute(query)
+    series_rows = cursor.fetchall()
+
+    created = 0
+    for row in series_rows:
+        current_series_id, source_event_id = row[0], row[1]
+        start_date = datetime.strptime(row[7], "%Y-%m-%d").date()
+        dates = series_dates(start_date, row[9], today, horizon_end)
+        # Один executemany на серию; уже созданные даты пропускает уникальный индекс
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO events (
+                    name, description, price, address, max_participants,
+                    event_date, event_time, series_id
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(*row[2:7], event_date, row[8], current_series_id) for event_date in dates],
+            )
+            inserted = conn.total_changes - before
+        if inserted:
+            copy_series_poster(cursor, current_series_id, source_event_id)
+        created += inserted
+
+    conn.close()
+    return created
+
+
+def copy_series_poster(cursor, series_id: int, source_event_id: int):
+    source_path = get_poster_path(source_event_id)
+    if not source_path.exists():
+        return
+    cursor.execute(
+        """
+        SELECT event_id FROM events
+        WHERE series_id = ? AND is_deleted = 0 AND date(event_date) >= date('now')
+        """,
+        (series_id,),
+    )
+    for (event_id,) in cursor.fetchall():
+        poster_path = get_poster_path(event_id)
+        if event_id != source_event_id and not poster_path.exists():
+            shutil.copyfile(source_path, poster_path)
+
+
+def create_series_from_event(event_id: int, interval_weeks: int = 1) -> int | None:
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT name, description, price, address, max_participants, event_date, event_time
+        FROM events
+        WHERE event_id = ? AND is_deleted = 0
+        """,
+        (event_id,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        conn.close()
+        return None
+
+    with conn:
+        cursor.execute(
+            """
+            INSERT INTO event_series (
+                source_event_id, name, description, price, address,
+                max_participants, start_date, event_time, interval_weeks
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (event_id, *row, interval_weeks),
+        )
+        series_id = cursor.lastrowid
+        cursor.execute("UPDATE events SET series_id = ? WHERE event_id = ?", (series_id, event_id))
+    conn.close()
+
+    if materialize_series(series_id):
+        catalog.reload()
+    return series_id
+
+
+def apply_field_to_series(event_id: int, field: str) -> int:
+    # Одним UPDATE переносим значение поля с экземпляра на все будущие ивенты серии
+    if field not in SERIES_FIELDS:
+        raise ValueError(field)
+    series_id = get_event_series_id(event_id)
+    if series_id is None:
+        return 0
+
+    conn = connect(DB_PATH)
+    with conn:
+        conn.execute(
+            f"""
+            UPDATE event_series
+            SET {field} = (SELECT {field} FROM events WHERE event_id = ?)
+            WHERE series_id = ?
+            """,
+            (event_id, series_id),
+        )
+        cursor = conn.execute(
+            f"""
+            UPDATE events
+            SET {field} = (SELECT {field} FROM events WHERE event_id = ?)
+            WHERE series_id = ?
+              AND is_deleted = 0
+              AND date(event_date) >= date('now')
+            """,
+            (event_id, series_id),
+        )
+        updated = cursor.rowcount
+    conn.close()
+    catalog.reload()
+    return updated
+
+
+def apply_poster_to_series(event_id: int) -> int:
+    series_id = get_event_series_id(event_id)
+    if series_id is None:
+        return 0
+
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("UPDATE event_series SET source_event_id = ? WHERE series_id = ?", (event_id, series_id))
+    conn.commit()
+    cursor.execute(
+        """
+        SELECT event_id FROM events
+        WHERE series_id = ? AND is_deleted = 0 AND date(event_date) >= date('now')
+        """,
+        (series_id,),
+    )
+    event_ids = [row[0] for row in cursor.fetchall() if row[0] != event_id]
+    conn.close()
+
+    source_path = get_poster_path(event_id)
+    for other_id in event_ids:
+        poster_path = get_poster_path(other_id)
+        if source_path.exists():
+            shutil.copyfile(source_path, poster_path)
+        elif poster_path.exists():
+            poster_path.unlink()
+    return len(event_ids)
+
+
+def stop_series(event_id: int) -> bool:
+    series_id = get_event_series_id(event_id)
+    if series_id is None:
+        return False
+    conn = connect(DB_PATH)
+    conn.execute("UPDATE event_series SET is_active = 0 WHERE series_id = ?", (series_id,))
+    conn.commit()
+    conn.close()
+    return True
+
+
+async def series_loop():
+    while True:
+        try:
+            created = await asyncio.to_thread(materialize_series)
+            if created:
+                catalog.reload()
+                logging.info("Создано ивентов по сериям: %s", created)
+        except Exception:
+            logging.exception("Ошибка при создании ивентов серий")
+        await asyncio.sleep(SERIES_CHECK_INTERVAL_SECONDS)
+
+
+# --------------------------------------------------
+# Callback-хендлеры
+# --------------------------------------------------
+
+@router.callback_query(lambda c: c.data.startswith("series_make:"))
+async def series_make(call: CallbackQuery):
+    event_id = int(call.data.split(":")[1])
+    if get_event_series_id(event_id) is not None:
+        await call.answer("Ивент уже в серии", show_alert=True)
+        return
+
+    series_id = create_series_from_event(event_id)
+    if series_id is None:
+        await call.answer("Ивент не найден", show_alert=True)
+        return
+
+    await call.message.edit_reply_markup(reply_markup=event_edit_kb(event_id, in_series=True))
+    await call.message.answer(
+        f"🔁 Серия создана: ивент будет повторяться каждую неделю "
+        f"(экземпляры создаются на {SERIES_HORIZON_WEEKS} недель вперёд)."
+    )
+    await call.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith("series_stop:"))
+async def series_stop(call: CallbackQuery):
+    event_id = int(call.data.split(":")[1])
+    if not stop_series(event_id):
+        await call.answer("Ивент не входит в серию", show_alert=True)
+        return
+
+    await call.message.edit_reply_markup(reply_markup=event_edit_kb(event_id, in_series=False))
+    await call.message.answer("⏹ Серия остановлена. Уже созданные ивенты сохранены.")
+    await call.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith("series_apply:"))
+async def series_apply(call: CallbackQuery):
+    _, event_id, field_key = call.data.split(":")
+    event_id = int(event_id)
+
+    if field_key == "poster":
+        updated = apply_poster_to_series(event_id)
+    else:
+        updated = apply_field_to_series(event_id, EDIT_FIELDS[field_key][1])
+
+    await call.message.edit_reply_markup(reply_markup=None)
+    await call.message.answer(f"🔁 Изменение применено к серии (ивентов: {updated}).")
+    await call.answer()
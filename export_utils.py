@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import Iterable
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX-выгрузка необязательна
+    Workbook = None
+
+PARTICIPANTS_HEADER = ["№", "Имя", "Никнейм", "user_id", "Отметка"]
+
+
+def xlsx_available() -> bool:
+    return Workbook is not None
+
+
+def _participant_rows(rows: Iterable[tuple]) -> Iterable[list]:
+    for number, (user_name, user_nickname, user_id, checked_in_at) in enumerate(rows, start=1):
+        nickname = f"@{user_nickname}" if user_nickname else ""
+        # Колонка «Отметка» заполняется при чек-ине по QR-билету
+        yield [number, user_name, nickname, user_id, checked_in_at or ""]
+
+
+def write_participants_csv(rows: Iterable[tuple], path: Path) -> int:
+    # Пишем построчно — в памяти не держим весь список участников
+    count = 0
+    with path.open("w", encoding="utf-8-sig", newline="") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(PARTICIPANTS_HEADER)
+        for row in _participant_rows(rows):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_participants_xlsx(rows: Iterable[tuple], path: Path) -> int:
+    if Workbook is None:
+        raise RuntimeError("Для выгрузки в XLSX установите openpyxl")
+    # write_only-режим openpyxl сбрасывает строки на диск по мере записи
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Участники")
+    sheet.append(PARTICIPANTS_HEADER)
+    count = 0
+    for row in _participant_rows(rows):
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
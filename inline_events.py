@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+from aiogram import Router
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InputTextMessageContent,
+)
+
+from event_catalog import catalog
+from participant_events import count_registrations_by_event, format_event_text, get_cached_poster_file_id
+from tenants import TenantLocal
+
+router = Router()
+
+# Кэш на стороне Telegram: выдача показывает «Мест нет», поэтому держим его коротким
+INLINE_CACHE_TIME = 30
+INLINE_RESULTS_LIMIT = 50
+INLINE_CACHE_SIZE = 512
+# запрос -> (версия каталога, подходящие ивенты)
+_query_cache = TenantLocal(OrderedDict)
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def event_matches(event_row, tokens: list[str]) -> bool:
+    haystack = f"{event_row[1]} {event_row[2]} {event_row[4]}".lower()
+    return all(token in haystack for token in tokens)
+
+
+def find_cached_prefix(query: str):
+    # Уточнение запроса только сужает выборку, поэтому фильтруем
+    # результаты самого длинного закэшированного префикса, а не весь каталог
+    for length in range(len(query) - 1, -1, -1):
+        cached = _query_cache.get(query[:length])
+        if cached and cached[0] == catalog.version:
+            return cached[1]
+    return None
+
+
+def match_events(query: str) -> list[tuple]:
+    candidates = find_cached_prefix(query)
+    if candidates is None:
+        candidates = catalog.future_events()
+    tokens = query.split()
+    return [event_row for event_row in candidates if event_matches(event_row, tokens)]
+
+
+def build_inline_result(event_row, bot_username: str, is_full: bool):
+    event_id = event_row[0]
+    text = format_event_text(event_row, is_full=is_full)
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="✅ Записаться", url=f"https://t.me/{bot_username}?start=event_{event_id}")]
+    ])
+    file_id = get_cached_poster_file_id(event_id)
+    if file_id:
+        return InlineQueryResultCachedPhoto(
+            id=str(event_id),
+            photo_file_id=file_id,
+            title=event_row[1],
+            caption=text,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+        )
+    return InlineQueryResultArticle(
+        id=str(event_id),
+        title=event_row[1],
+        description=f"📅 {event_row[6]} ⏰ {event_row[7]} · {event_row[4]}",
+        input_message_content=InputTextMessageContent(message_text=text, parse_mode="HTML"),
+        reply_markup=keyboard,
+    )
+
+
+def get_inline_results(query: str, bot_username: str) -> list:
+    cached = _query_cache.get(query)
+    if cached and cached[0] == catalog.version:
+        _query_cache.move_to_end(query)
+        events = cached[1]
+    else:
+        events = match_events(query)
+        _query_cache[query] = (catalog.version, events)
+        _query_cache.move_to_end(query)
+        while len(_query_cache) > INLINE_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+    # Заполненность и file_id афиш меняются без смены версии каталога,
+    # поэтому кэшируем только подбор ивентов, а результаты собираем заново
+    events = events[:INLINE_RESULTS_LIMIT]
+    counts = count_registrations_by_event([event_row[0] for event_row in events])
+    return [
+        build_inline_result(
+            event_row,
+            bot_username,
+            is_full=event_row[5] is not None and counts.get(event_row[0], 0) >= event_row[5],
+        )
+        for event_row in events
+    ]
+
+
+@router.inline_query()
+async def inline_events(inline_query: InlineQuery):
+    me = await inline_query.bot.me()
+    results = get_inline_results(normalize_query(inline_query.query), me.username)
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=False)
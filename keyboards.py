@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from collections import OrderedDict
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+KEYBOARD_CACHE_SIZE = 2048
+
+# (шаблон, параметры) -> (разметка, её JSON)
+_rendered: OrderedDict[tuple, tuple[InlineKeyboardMarkup, str]] = OrderedDict()
+# id(разметки) -> (JSON, шаблон, параметры); пока разметка лежит в _rendered, её id не переиспользуется
+_rendered_by_id: dict[int, tuple[str, KeyboardTemplate, dict]] = {}
+
+
+class KeyboardTemplate:
+    # Inline-клавиатура, которая собирается и проверяется pydantic один раз.
+    # В callback_data и тексте кнопок — плейсхолдеры вида {event_id}; при рендере
+    # подставляются только они, без повторной валидации и сериализации всей разметки.
+    def __init__(self, rows: list[list[tuple[str, str]]]):
+        self.rows = rows
+        template = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text=text, callback_data=callback_data) for text, callback_data in row]
+            for row in rows
+        ])
+        self._json = template.model_dump_json(exclude_none=True)
+
+    def render(self, **params) -> InlineKeyboardMarkup:
+        key = (id(self), *sorted(params.items()))
+        cached = _rendered.get(key)
+        if cached is not None:
+            _rendered.move_to_end(key)
+            return cached[0]
+
+        markup = InlineKeyboardMarkup.model_construct(inline_keyboard=[
+            [
+                InlineKeyboardButton.model_construct(text=text.format(**params), callback_data=callback_data.format(**params))
+                for text, callback_data in row
+            ]
+            for row in self.rows
+        ])
+        markup_json = self._json
+        for name, value in params.items():
+            markup_json = markup_json.replace(f"{{{name}}}", json.dumps(str(value))[1:-1])
+
+        _rendered[key] = (markup, markup_json)
+        _rendered_by_id[id(markup)] = (markup_json, self, params)
+        if len(_rendered) > KEYBOARD_CACHE_SIZE:
+            evicted, _ = _rendered.popitem(last=False)[1]
+            _rendered_by_id.pop(id(evicted), None)
+        return markup
+
+    def with_rows(self, rows: list[list[tuple[str, str]]]) -> KeyboardTemplate:
+        # Тот же шаблон с дополнительными строками снизу (например, навигация карусели)
+        return KeyboardTemplate([*self.rows, *rows])
+
+
+def get_template(markup: InlineKeyboardMarkup) -> tuple[KeyboardTemplate, dict] | None:
+    # Из какого шаблона и с какими параметрами отрисована разметка
+    rendered = _rendered_by_id.get(id(markup))
+    if rendered is None:
+        return None
+    return rendered[1], rendered[2]
+
+
+def markup_json(markup: InlineKeyboardMarkup) -> str:
+    # Для клавиатур из шаблонов JSON уже готов, остальные сериализуем
+    rendered = _rendered_by_id.get(id(markup))
+    if rendered is not None:
+        return rendered[0]
+    return markup.model_dump_json(exclude_none=True)
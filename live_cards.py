@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.types import Message
+
+from tenants import TenantLocal
+
+# Сколько ждём после изменения, чтобы собрать пачку регистраций в одно обновление
+LIVE_CARDS_DEBOUNCE_SECONDS = 3.0
+LIVE_CARDS_EDITS_PER_SECOND = 20
+# Не больше, чем participant_events хранит хэшей отрисованных карточек (RENDERED_CARDS_LIMIT)
+LIVE_CARDS_LIMIT = 5000
+
+# (chat_id, message_id) -> (event_id, показана ли карточка в карусели)
+_cards = TenantLocal(OrderedDict)
+# event_id -> карточки, которые его сейчас показывают
+_event_cards = TenantLocal(dict)
+_dirty_events = TenantLocal(set)
+# bot_id -> задача, которая соберёт и отправит правки
+_flush_tasks: dict[int, asyncio.Task] = {}
+
+
+def track_card(event_id: int, message: Message, in_carousel: bool = False):
+    key = (message.chat.id, message.message_id)
+    forget_card(key)
+    _cards[key] = (event_id, in_carousel)
+    _event_cards.setdefault(event_id, set()).add(key)
+    if len(_cards) > LIVE_CARDS_LIMIT:
+        forget_card(next(iter(_cards)))
+
+
+def forget_card(key: tuple[int, int]):
+    tracked = _cards.pop(key, None)
+    if tracked is None:
+        return
+    keys = _event_cards.get(tracked[0])
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del _event_cards[tracked[0]]
+
+
+def mark_event_changed(bot: Bot, event_id: int):
+    # Регистрация, отмена или правка ивента: отправленные карточки обновятся
+    # одной пачкой через LIVE_CARDS_DEBOUNCE_SECONDS
+    if event_id not in _event_cards:
+        return
+    _dirty_events.add(event_id)
+    flush_task = _flush_tasks.get(bot.id)
+    if flush_task is None or flush_task.done():
+        # Задача наследует контекст, то есть площадку текущего апдейта
+        _flush_tasks[bot.id] = asyncio.create_task(_flush_later(bot))
+
+
+async def _flush_later(bot: Bot):
+    await asyncio.sleep(LIVE_CARDS_DEBOUNCE_SECONDS)
+    while _dirty_events:
+        event_id = _dirty_events.pop()
+        try:
+            await refresh_event_cards(bot, event_id)
+        except Exception:
+            logging.exception("Ошибка при обновлении карточек ивента %s", event_id)
+
+
+async def refresh_event_cards(bot: Bot, event_id: int):
+    from participant_events import (
+        add_carousel_nav,
+        build_event_keyboard,
+        format_event_text,
+        get_event_by_id,
+        get_event_user_ids,
+        get_poster_path,
+        get_rendered_hash,
+        hash_card,
+        is_event_full,
+        is_unreachable_chat_error,
+        remember_rendered,
+        set_user_active,
+    )
+
+    event_row = get_event_by_id(event_id)
+    if event_row is None:
+        for key in list(_event_cards.get(event_id, ())):
+            forget_card(key)
+        return
+
+    # Текст у всех карточек общий, клавиатура зависит только от того, записан ли пользователь
+    is_full = is_event_full(event_row)
+    text = format_event_text(event_row, is_full=is_full)
+    registered = set(get_event_user_ids(event_id))
+    has_poster = get_poster_path(event_id).exists()
+
+    for key in list(_event_cards.get(event_id, ())):
+        tracked = _cards.get(key)
+        # Пока шли правки, пользователь мог перелистнуть карусель на другой ивент
+        if tracked is None or tracked[0] != event_id:
+            continue
+        chat_id, message_id = key
+        keyboard = build_event_keyboard(event_id, chat_id, is_full=is_full, is_registered=chat_id in registered)
+        if tracked[1]:
+            keyboard = add_carousel_nav(event_row, keyboard)
+        old_hash = get_rendered_hash(key)
+        new_hash = hash_card(text, keyboard)
+        if old_hash == new_hash:
+            continue
+
+        try:
+            if old_hash is not None and old_hash[0] == new_hash[0]:
+                await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=keyboard)
+            elif has_poster:
+                await bot.edit_message_caption(
+                    chat_id=chat_id, message_id=message_id, caption=text, reply_markup=keyboard, parse_mode="HTML"
+                )
+            else:
+                await bot.edit_message_text(
+                    text, chat_id=chat_id, message_id=message_id, reply_markup=keyboard, parse_mode="HTML"
+                )
+        except TelegramRetryAfter as error:
+            # Не бросаем пачку: подождём и попробуем эту карточку в следующий раз
+            _dirty_events.add(event_id)
+            await asyncio.sleep(error.retry_after)
+            return
+        except (TelegramBadRequest, TelegramForbiddenError) as error:
+            # Сообщение удалено, слишком старое или сменило тип — больше не следим
+            if "message is not modified" not in str(error):
+                forget_card(key)
+                if is_unreachable_chat_error(error):
+                    # Как и при остальных отправках: не пишем, пока пользователь снова не нажмёт /start
+                    set_user_active(chat_id, False)
+                continue
+        remember_rendered(key, text, keyboard)
+        await asyncio.sleep(1 / LIVE_CARDS_EDITS_PER_SECOND)
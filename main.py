@@ -1,21 +1,34 @@
 import asyncio
 import logging
-import sqlite3
-from pathlib import Path
 
 from aiogram import Bot, Dispatcher
-from aiogram.filters import CommandStart
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import Message, KeyboardButton, ReplyKeyboardMarkup
 
-from config import ADMINS, BOT_TOKEN
+from analytics import show_stats
+from archive_events import archive_loop
+from backup_db import backup_loop, make_backup
+from bot_api import api_middleware
+from broadcast import router as broadcast_router, resume_broadcasts, start_broadcast
 from create_event import router as create_event_router, start_new_event
+from event_import import router as event_import_router, start_import
+from event_search import router as event_search_router, start_search
+from event_series import router as event_series_router, series_loop
+from inline_events import router as inline_events_router
+from middlewares import ChatOrderingMiddleware, SingleFlightMiddleware, ThrottlingMiddleware
+from profiling import ProfilingMiddleware, router as profiling_router
 from participant_events import (
     router as participant_router,
     send_nearest_event,
     reminder_loop,
 )
+from query_log import connect
+from replay import recorder, router as replay_router
+from tenants import ADMINS, TENANTS, TenantMiddleware, TenantPath, run_for_tenant
+from tickets import handle_checkin, parse_checkin_token, router as tickets_router, tickets_loop
 from view_event_admin import router as view_event_router, show_future_events
 
 # --- Логирование ---
@@ -23,23 +36,32 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 
 # --- Инициализация ---
 storage = MemoryStorage()
-bot = Bot(token=BOT_TOKEN)
+# Один бот на площадку, HTTP-пул общий
+session = AiohttpSession()
+# Повторы, backoff и circuit breaker для всех исходящих вызовов Bot API
+session.middleware(api_middleware)
+bots = [Bot(token=tenant.token, session=session) for tenant in TENANTS]
+bot = bots[0]
 dp = Dispatcher(storage=storage)
 
-DB_PATH = Path(__file__).resolve().parent / "data.db"
+DB_PATH = TenantPath("data.db")
 
 # --- Админское меню ---
 admin_menu = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text="Новый ивент")],
-        [KeyboardButton(text="Посмотреть все будущие ивенты")]
+        [KeyboardButton(text="Посмотреть все будущие ивенты")],
+        [KeyboardButton(text="Найти ивент")],
+        [KeyboardButton(text="Статистика")],
+        [KeyboardButton(text="Импорт ивентов")],
+        [KeyboardButton(text="Рассылка")]
     ],
     resize_keyboard=True
 )
 
 
 def upsert_user(user_id: int, username: str, nickname: str):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -56,10 +78,20 @@ def upsert_user(user_id: int, username: str, nickname: str):
     conn.close()
 
 
+def parse_event_deep_link(args: str | None) -> int | None:
+    if args and args.startswith("event_") and args[len("event_"):].isdigit():
+        return int(args[len("event_"):])
+    return None
+
+
 # --- Хендлер /start ---
 @dp.message(CommandStart())
-async def start_handler(message: Message):
-    if message.from_user.id in ADMINS:
+async def start_handler(message: Message, command: CommandObject):
+    checkin_token = parse_checkin_token(command.args)
+    if message.from_user.id in ADMINS and checkin_token:
+        # Админ отсканировал QR-билет на входе
+        await handle_checkin(message, checkin_token)
+    elif message.from_user.id in ADMINS:
         await message.answer("Привет, админ 👋 Выбери действие:", reply_markup=admin_menu)
     else:
         upsert_user(
@@ -68,11 +100,21 @@ async def start_handler(message: Message):
             message.from_user.full_name,
         )
         await message.answer("Привет! Это Фильмовочная 🎬")
-        await send_nearest_event(message)
+        await send_nearest_event(message, parse_event_deep_link(command.args))
+
+
+# --- Ручной бэкап БД ---
+@dp.message(Command("backup"))
+async def backup_handler(message: Message):
+    if message.from_user.id not in ADMINS:
+        return
+
+    path = await asyncio.to_thread(make_backup)
+    await message.answer(f"💾 Бэкап сохранён: {path.name}")
 
 
 # --- Хендлер меню админа (ловит только кнопки) ---
-@dp.message(lambda msg: msg.text in ["Новый ивент", "Посмотреть все будущие ивенты"])
+@dp.message(lambda msg: msg.text in ["Новый ивент", "Посмотреть все будущие ивенты", "Найти ивент", "Статистика", "Импорт ивентов", "Рассылка"])
 async def admin_menu_handler(message: Message, state: FSMContext):
     if message.from_user.id not in ADMINS:
         return
@@ -81,18 +123,67 @@ async def admin_menu_handler(message: Message, state: FSMContext):
         await start_new_event(message, state)
     elif message.text == "Посмотреть все будущие ивенты":
         await show_future_events(message)
+    elif message.text == "Найти ивент":
+        await start_search(message, state)
+    elif message.text == "Статистика":
+        await show_stats(message)
+    elif message.text == "Импорт ивентов":
+        await start_import(message, state)
+    elif message.text == "Рассылка":
+        await start_broadcast(message, state)
+
+
+# --- Площадка определяется по боту, которому пришёл апдейт (должно быть первым) ---
+dp.update.outer_middleware(TenantMiddleware())
+
+# --- Запись апдейтов для воспроизведения нагрузки (включается командой /record) ---
+dp.update.outer_middleware(recorder)
+
+# --- Одинаковые нажатия, пока первое ещё обрабатывается, ждут его результата ---
+dp.update.outer_middleware(SingleFlightMiddleware())
+
+# --- Апдейты одного чата — по порядку, разные чаты — параллельно с лимитом ---
+ordering = ChatOrderingMiddleware(exempt=ADMINS)
+dp.update.outer_middleware(ordering)
+
+# --- Антиспам: троттлинг ---
+throttling = ThrottlingMiddleware(exempt=ADMINS)
+dp.message.outer_middleware(throttling)
+dp.callback_query.outer_middleware(throttling)
 
+# --- Профилирование хендлеров (включается командой /profile) ---
+profiling = ProfilingMiddleware()
+dp.message.middleware(profiling)
+dp.callback_query.middleware(profiling)
+dp.inline_query.middleware(profiling)
 
 # --- Подключаем модуль создания ивента ---
+dp.include_router(profiling_router)
+dp.include_router(replay_router)
 dp.include_router(create_event_router)
+dp.include_router(event_import_router)
 dp.include_router(view_event_router)
+dp.include_router(event_series_router)
+dp.include_router(broadcast_router)
+dp.include_router(event_search_router)
+dp.include_router(inline_events_router)
+dp.include_router(tickets_router)
 dp.include_router(participant_router)
 
 
 async def main():
-    logging.info("Бот запущен")
-    asyncio.create_task(reminder_loop(bot))
-    await dp.start_polling(bot)
+    logging.info("Бот запущен, площадок: %s", len(TENANTS))
+    for tenant, tenant_bot in zip(TENANTS, bots):
+        asyncio.create_task(run_for_tenant(tenant, reminder_loop(tenant_bot)))
+        asyncio.create_task(run_for_tenant(tenant, series_loop()))
+        asyncio.create_task(run_for_tenant(tenant, archive_loop()))
+        asyncio.create_task(run_for_tenant(tenant, backup_loop()))
+        asyncio.create_task(run_for_tenant(tenant, tickets_loop(tenant_bot)))
+        await run_for_tenant(tenant, resume_broadcasts(tenant_bot))
+    try:
+        await dp.start_polling(*bots)
+    finally:
+        recorder.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, TelegramObject, Update
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+THROTTLE_RATE_PER_SECOND = 1.0
+THROTTLE_BURST = 5
+THROTTLE_MAX_USERS = 10_000
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    # Token bucket на пользователя: до THROTTLE_BURST действий подряд,
+    # дальше — не чаще THROTTLE_RATE_PER_SECOND в секунду
+    def __init__(self, rate: float = THROTTLE_RATE_PER_SECOND, burst: int = THROTTLE_BURST, exempt=()):
+        self.rate = rate
+        self.burst = burst
+        self.exempt = exempt
+        # replay.py выключает троттлинг, чтобы воспроизводить запись в любом темпе
+        self.enabled = True
+        # (id бота, id пользователя) -> корзина: у каждой площадки свой лимит
+        self._buckets: dict[tuple[int, int], tuple[float, float]] = {}
+
+    def _take_token(self, key: tuple[int, int]) -> bool:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > THROTTLE_MAX_USERS:
+            self._drop_full_buckets(now)
+        return allowed
+
+    def _drop_full_buckets(self, now: float):
+        # Полностью восстановившиеся корзины ничем не отличаются от отсутствующих
+        refill_time = self.burst / self.rate
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if now - bucket[1] < refill_time
+        }
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        user = data.get("event_from_user")
+        if not self.enabled or user is None or user.id in self.exempt or self._take_token((data["bot"].id, user.id)):
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Не так быстро")
+        return None
+
+
+class SingleFlightMiddleware(BaseMiddleware):
+    # Одинаковые callback'и одного пользователя, пришедшие пока первый
+    # ещё обрабатывается, ждут его результата вместо повторной обработки.
+    # Ставится на dp.update перед ChatOrderingMiddleware: иначе дубли встают
+    # в очередь чата за первым нажатием и выполняются по одному.
+    def __init__(self):
+        self._in_flight: dict[tuple[int, int, str], asyncio.Future] = {}
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        callback = event.callback_query if isinstance(event, Update) else event
+        if not isinstance(callback, CallbackQuery) or callback.data is None:
+            return await handler(event, data)
+
+        # id бота в ключе: одинаковые нажатия в ботах разных площадок — разные действия
+        key = (data["bot"].id, callback.from_user.id, callback.data)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            try:
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # Отменили первое нажатие, а не этот апдейт — завершаемся как при ошибке
+                if not in_flight.cancelled():
+                    raise
+                return None
+            except Exception:
+                return None
+            finally:
+                await callback.answer()
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await handler(event, data)
+        except Exception as error:
+            future.set_exception(error)
+            # Исключение уже передаётся дальше — не даём asyncio ругаться на непрочитанное
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            self._in_flight.pop(key, None)
+
+
+ORDERING_MAX_WORKERS = 32
+ORDERING_MAX_PENDING = 500
+
+
+class ChatOrderingMiddleware(BaseMiddleware):
+    # Outer-middleware на dp.update: апдейты одного чата обрабатываются строго
+    # по очереди (шаги FSM, быстрые нажатия «записаться»/«отменить»), разные чаты —
+    # параллельно, но не больше max_workers одновременно. Если в очереди больше
+    # max_pending апдейтов, новые от обычных пользователей отбрасываются.
+    def __init__(self, max_workers: int = ORDERING_MAX_WORKERS, max_pending: int = ORDERING_MAX_PENDING, exempt=()):
+        self.max_pending = max_pending
+        self.exempt = exempt
+        self._workers = asyncio.Semaphore(max_workers)
+        # (id бота, id чата) -> замок чата и число апдейтов, которые его держат или ждут.
+        # Личный чат пользователя с ботами разных площадок имеет один и тот же id
+        self._chats: dict[tuple[int, int], tuple[asyncio.Lock, int]] = {}
+        self.pending = 0
+        self.shed = 0
+
+    def _acquire_chat(self, key: tuple[int, int]) -> asyncio.Lock:
+        lock, users = self._chats.get(key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._chats[key] = (lock, users + 1)
+        return lock
+
+    def _release_chat(self, key: tuple[int, int]):
+        lock, users = self._chats[key]
+        if users == 1:
+            del self._chats[key]
+        else:
+            self._chats[key] = (lock, users - 1)
+
+    async def _shed(self, event: TelegramObject):
+        self.shed += 1
+        if self.shed % 100 == 1:
+            logging.warning("Очередь апдейтов переполнена (%s), отброшено всего: %s", self.pending, self.shed)
+        callback = getattr(event, "callback_query", None)
+        if callback is not None:
+            await callback.answer("⏳ Бот перегружен, попробуй через минуту")
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        chat = data.get("event_chat")
+        user = data.get("event_from_user")
+        chat_id = chat.id if chat else user.id if user else None
+        if chat_id is None:
+            return await handler(event, data)
+
+        if self.pending >= self.max_pending and not (user and user.id in self.exempt):
+            await self._shed(event)
+            return None
+
+        self.pending += 1
+        key = (data["bot"].id, chat_id)
+        lock = self._acquire_chat(key)
+        try:
+            async with lock:
+                async with self._workers:
+                    return await handler(event, data)
+        finally:
+            self.pending -= 1
+            self._release_chat(key)
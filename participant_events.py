@@ -1,9 +1,11 @@
 import asyncio
-import sqlite3
+import logging
+from collections import OrderedDict
 from datetime import datetime, time
 from pathlib import Path
 
 from aiogram import Router, Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.types import (
     Message,
     InlineKeyboardMarkup,
@@ -13,42 +15,64 @@ from aiogram.types import (
     KeyboardButton,
     BufferedInputFile,
     FSInputFile,
+    InputMediaPhoto,
 )
 
+from analytics import record_stat
+from event_catalog import catalog, load_event
 from ics_utils import build_event_ics
-DB_PATH = Path(__file__).resolve().parent / "data.db"
-PICS_DIR = Path(__file__).resolve().parent / "pics"
+from keyboards import KeyboardTemplate, get_template, markup_json
+from live_cards import LIVE_CARDS_LIMIT, forget_card, mark_event_changed, track_card
+from query_log import connect
+from tenants import TenantLocal, TenantPath
+DB_PATH = TenantPath("data.db")
+PICS_DIR = TenantPath("pics")
 router = Router()
 
 REMINDER_WINDOW_MINUTES = 2
 REMINDER_TIME = time(10, 0)
 REMINDER_CHECK_INTERVAL_SECONDS = 60
-_sent_reminders: dict[str, set[tuple[int, int]]] = {}
+# "carousel" — одна карточка с листанием, "album" — афиши альбомами,
+# "list" — каждый ивент отдельным сообщением
+ALL_EVENTS_VIEW = "carousel"
+USER_EVENTS_VIEW = "album"
+ALBUM_SIZE = 10
+# Несколько ивентов за день — одно напоминание со всеми сразу, а не по сообщению на ивент
+REMINDER_DIGEST = True
+# Афиши к сводке — отдельным альбомом перед ней
+REMINDER_DIGEST_POSTERS = True
+_sent_reminders = TenantLocal(dict)
+# Ошибки Bot API, после которых писать пользователю бессмысленно
+UNREACHABLE_CHAT_ERRORS = ("chat not found", "user is deactivated", "bot was blocked")
+# event_id -> (mtime файла афиши, file_id уже загруженной в Telegram афиши)
+_poster_file_ids = TenantLocal(dict)
+# (chat_id, message_id) -> хэши последних отправленных текста и клавиатуры карточки
+_rendered_cards = TenantLocal(OrderedDict)
+# Хэш нужен каждой карточке, за которой следит live_cards, иначе её правки не пропускаются
+RENDERED_CARDS_LIMIT = LIVE_CARDS_LIMIT
 
 
 def get_future_events(limit: int | None = None):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    query = """
-        SELECT event_id, name, description, price, address,
-               max_participants, event_date, event_time
-        FROM events
-        WHERE is_deleted = 0
-          AND date(event_date) >= date('now')
-        ORDER BY event_date, event_time
-    """
-    if limit:
-        query += " LIMIT ?"
-        cursor.execute(query, (limit,))
-    else:
-        cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return catalog.future_events(limit)
+
+
+def get_adjacent_future_event(event_id: int, direction: str):
+    # Соседний ивент по (дата, время, id) относительно текущего
+    event_row = get_event_by_id(event_id)
+    if event_row is None:
+        # Ивент с карточки удалён или уже в архиве — ключа для поиска соседа нет,
+        # начинаем карусель сначала, чтобы она не застряла
+        events = get_future_events(limit=1)
+        return events[0] if events else None
+    return catalog.adjacent(event_row, direction)
+
+
+def get_future_event_position(event_row) -> tuple[int, int]:
+    return catalog.position(event_row)
 
 
 def get_user_events(user_id: int):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -69,7 +93,7 @@ def get_user_events(user_id: int):
 
 
 def get_user_notification_setting(user_id: int) -> bool:
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT notification_on FROM users WHERE user_id = ?",
@@ -83,7 +107,7 @@ def get_user_notification_setting(user_id: int) -> bool:
 
 
 def set_user_notification_setting(user_id: int, enabled: bool):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "UPDATE users SET notification_on = ? WHERE user_id = ?",
@@ -93,8 +117,27 @@ def set_user_notification_setting(user_id: int, enabled: bool):
     conn.close()
 
 
+def set_user_active(user_id: int, active: bool):
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE users SET active = ? WHERE user_id = ?",
+        (1 if active else 0, user_id),
+    )
+    conn.commit()
+    conn.close()
+
+
+def is_unreachable_chat_error(error: Exception) -> bool:
+    if isinstance(error, TelegramForbiddenError):
+        return True
+    if isinstance(error, TelegramBadRequest):
+        return any(reason in error.message.lower() for reason in UNREACHABLE_CHAT_ERRORS)
+    return False
+
+
 def count_event_registrations(event_id: int) -> int:
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT COUNT(*) FROM registrations WHERE event_id = ?",
@@ -105,8 +148,24 @@ def count_event_registrations(event_id: int) -> int:
     return count
 
 
+def count_registrations_by_event(event_ids: list[int]) -> dict[int, int]:
+    # Одним запросом для списка ивентов (inline-выдача)
+    if not event_ids:
+        return {}
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    placeholders = ", ".join("?" * len(event_ids))
+    cursor.execute(
+        f"SELECT event_id, COUNT(*) FROM registrations WHERE event_id IN ({placeholders}) GROUP BY event_id",
+        event_ids,
+    )
+    counts = dict(cursor.fetchall())
+    conn.close()
+    return counts
+
+
 def is_user_registered(event_id: int, user_id: int) -> bool:
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT 1 FROM registrations WHERE event_id = ? AND user_id = ? LIMIT 1",
@@ -117,8 +176,17 @@ def is_user_registered(event_id: int, user_id: int) -> bool:
     return exists
 
 
+def get_event_user_ids(event_id: int) -> list[int]:
+    conn = connect(DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("SELECT user_id FROM registrations WHERE event_id = ?", (event_id,))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    conn.close()
+    return user_ids
+
+
 def register_user_for_event(event_id: int, user_id: int, user_name: str, user_nickname: str):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT name FROM events WHERE event_id = ?",
@@ -137,19 +205,26 @@ def register_user_for_event(event_id: int, user_id: int, user_name: str, user_ni
     conn.close()
 
 
-def cancel_user_registration(event_id: int, user_id: int):
-    conn = sqlite3.connect(DB_PATH)
+def cancel_user_registration(event_id: int, user_id: int) -> bool:
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "DELETE FROM registrations WHERE event_id = ? AND user_id = ?",
         (event_id, user_id),
     )
+    removed = cursor.rowcount > 0
+    # Билет отменённой записи не должен пройти на входе
+    cursor.execute(
+        "DELETE FROM tickets WHERE event_id = ? AND user_id = ?",
+        (event_id, user_id),
+    )
     conn.commit()
     conn.close()
+    return removed
 
 
 def add_log_entry(user_id: int, user_name: str, user_nickname: str, description: str):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     now = datetime.now()
     cursor.execute(
@@ -187,90 +262,297 @@ def get_poster_path(event_id: int) -> Path:
     return PICS_DIR / f"{event_id}.png"
 
 
-def build_event_keyboard(event_id: int, user_id: int, is_full: bool) -> InlineKeyboardMarkup | None:
-    add_calendar_button = InlineKeyboardButton(
-        text="📅 Добавить в календарь (.ics)",
-        callback_data=f"user_ics:{event_id}",
-    )
-    if is_user_registered(event_id, user_id):
-        return InlineKeyboardMarkup(
-            inline_keyboard=[
-                [InlineKeyboardButton(text="❌ Отменить регистрацию", callback_data=f"user_cancel:{event_id}")],
-                [add_calendar_button],
-            ]
-        )
+def get_cached_poster_file_id(event_id: int) -> str | None:
+    # file_id годен, пока файл афиши не поменялся
+    cached = _poster_file_ids.get(event_id)
+    if cached is None:
+        return None
+    poster_path = get_poster_path(event_id)
+    if not poster_path.exists() or cached[0] != poster_path.stat().st_mtime:
+        return None
+    return cached[1]
+
+
+def get_poster_input(event_id: int) -> str | FSInputFile:
+    return get_cached_poster_file_id(event_id) or FSInputFile(get_poster_path(event_id))
+
+
+def remember_poster_file_id(event_id: int, message: Message):
+    if not message.photo:
+        return
+    poster_path = get_poster_path(event_id)
+    if poster_path.exists():
+        _poster_file_ids[event_id] = (poster_path.stat().st_mtime, message.photo[-1].file_id)
+
+
+ADD_CALENDAR_ROW = [("📅 Добавить в календарь (.ics)", "user_ics:{event_id}")]
+EVENT_REGISTERED_KB = KeyboardTemplate([
+    [("🎟 Мой билет", "user_ticket:{event_id}")],
+    [("❌ Отменить регистрацию", "user_cancel:{event_id}")],
+    ADD_CALENDAR_ROW,
+])
+EVENT_FULL_KB = KeyboardTemplate([ADD_CALENDAR_ROW])
+EVENT_OPEN_KB = KeyboardTemplate([
+    [("✅ Записаться", "user_register:{event_id}")],
+    ADD_CALENDAR_ROW,
+])
+
+
+def build_event_keyboard(
+    event_id: int, user_id: int, is_full: bool, is_registered: bool | None = None
+) -> InlineKeyboardMarkup | None:
+    # Разметка из шаблона общая для всех, кто её получил, — изменять её нельзя
+    if is_registered is None:
+        is_registered = is_user_registered(event_id, user_id)
+    if is_registered:
+        return EVENT_REGISTERED_KB.render(event_id=event_id)
     if is_full:
-        return InlineKeyboardMarkup(inline_keyboard=[[add_calendar_button]])
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="✅ Записаться", callback_data=f"user_register:{event_id}")],
-            [add_calendar_button],
-        ]
-    )
+        return EVENT_FULL_KB.render(event_id=event_id)
+    return EVENT_OPEN_KB.render(event_id=event_id)
 
 
 def get_event_by_id(event_id: int):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT event_id, name, description, price, address,
-               max_participants, event_date, event_time
-        FROM events
-        WHERE event_id = ? AND is_deleted = 0
-        """,
-        (event_id,),
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return row
+    # Прошедшие ивенты в каталоге не хранятся — за ними идём в БД
+    return catalog.get(event_id) or load_event(event_id)
+
+
+def is_event_full(event_row) -> bool:
+    max_participants = event_row[5]
+    registered_count = count_event_registrations(event_row[0])
+    return max_participants is not None and registered_count >= max_participants
 
 
 def build_event_card(event_row, user_id: int):
     event_id = event_row[0]
-    max_participants = event_row[5]
-    registered_count = count_event_registrations(event_id)
-    is_full = max_participants is not None and registered_count >= max_participants
+    is_full = is_event_full(event_row)
     text = format_event_text(event_row, is_full=is_full)
     keyboard = build_event_keyboard(event_id, user_id, is_full=is_full)
     return text, keyboard, is_full
 
 
+def hash_card(text: str, keyboard: InlineKeyboardMarkup | None) -> tuple[int, int]:
+    markup = markup_json(keyboard) if keyboard else ""
+    return hash(text), hash(markup)
+
+
+def get_rendered_hash(key: tuple[int, int]) -> tuple[int, int] | None:
+    return _rendered_cards.get(key)
+
+
+def remember_rendered(key: tuple[int, int], text: str, keyboard: InlineKeyboardMarkup | None):
+    _rendered_cards[key] = hash_card(text, keyboard)
+    _rendered_cards.move_to_end(key)
+    if len(_rendered_cards) > RENDERED_CARDS_LIMIT:
+        evicted_key, _ = _rendered_cards.popitem(last=False)
+        # Без хэша обновление карточки всегда шло бы полной правкой — перестаём за ней следить
+        forget_card(evicted_key)
+
+
+def remember_rendered_card(message: Message, text: str, keyboard: InlineKeyboardMarkup | None):
+    remember_rendered((message.chat.id, message.message_id), text, keyboard)
+
+
+def forget_rendered_card(message: Message):
+    _rendered_cards.pop((message.chat.id, message.message_id), None)
+
+
+async def edit_card_in_place(message: Message, text: str, keyboard: InlineKeyboardMarkup | None):
+    # Отправляем только то, что изменилось с прошлой отрисовки: ничего,
+    # одну клавиатуру или текст вместе с клавиатурой
+    new_hash = hash_card(text, keyboard)
+    old_hash = _rendered_cards.get((message.chat.id, message.message_id))
+    if old_hash is None and message.reply_markup == keyboard and message.html_text == text:
+        old_hash = new_hash
+
+    try:
+        if old_hash == new_hash:
+            return
+        if old_hash is not None and old_hash[0] == new_hash[0]:
+            await message.edit_reply_markup(reply_markup=keyboard)
+        elif message.photo:
+            await message.edit_caption(caption=text, reply_markup=keyboard, parse_mode="HTML")
+        else:
+            await message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+    except TelegramBadRequest as error:
+        # Кэш мог не знать о сообщении (например, после перезапуска бота)
+        if "message is not modified" not in str(error):
+            raise
+    remember_rendered_card(message, text, keyboard)
+
+
 async def send_event_message(message: Message, event_id: int, text: str, keyboard: InlineKeyboardMarkup | None):
     poster_path = get_poster_path(event_id)
     if poster_path.exists():
-        photo = FSInputFile(poster_path)
-        await message.answer_photo(photo, caption=text, reply_markup=keyboard, parse_mode="HTML")
+        sent = await message.answer_photo(
+            get_poster_input(event_id), caption=text, reply_markup=keyboard, parse_mode="HTML"
+        )
+        remember_poster_file_id(event_id, sent)
     else:
+        sent = await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+    remember_rendered_card(sent, text, keyboard)
+    track_card(event_id, sent, has_carousel_nav(keyboard))
+
+
+def build_album_summary(event_rows, user_id: int):
+    lines = []
+    rows = []
+    for number, event_row in enumerate(event_rows, start=1):
+        event_id, name = event_row[0], event_row[1]
+        is_full = is_event_full(event_row)
+        line = f"{number}. 🎬 <b>{name}</b> — 📅 {event_row[6]} ⏰ {event_row[7]}"
+        if is_full:
+            line += " ⚠️ Мест нет"
+        lines.append(line)
+
+        ics_button = InlineKeyboardButton(text=f"📅 {number}. .ics", callback_data=f"user_ics:{event_id}")
+        if is_user_registered(event_id, user_id):
+            action = InlineKeyboardButton(
+                text=f"❌ {number}. Отменить", callback_data=f"user_cancel:{event_id}:album"
+            )
+            rows.append([action, ics_button])
+        elif not is_full:
+            action = InlineKeyboardButton(
+                text=f"✅ {number}. Записаться", callback_data=f"user_register:{event_id}:album"
+            )
+            rows.append([action, ics_button])
+        else:
+            rows.append([ics_button])
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+async def send_events_album(message: Message, events):
+    # Афиши пачкой до 10 штук в одном send_media_group + одно сообщение с кнопками
+    user_id = message.from_user.id
+    for start in range(0, len(events), ALBUM_SIZE):
+        chunk = events[start:start + ALBUM_SIZE]
+        posters = []
+        for number, event_row in enumerate(chunk, start=1):
+            event_id = event_row[0]
+            if not get_poster_path(event_id).exists():
+                continue
+            caption = f"<b>{number}.</b> {format_event_text(event_row, is_full=is_event_full(event_row))}"
+            posters.append((event_id, caption))
+
+        if len(posters) == 1:
+            event_id, caption = posters[0]
+            sent = await message.answer_photo(get_poster_input(event_id), caption=caption, parse_mode="HTML")
+            remember_poster_file_id(event_id, sent)
+        elif posters:
+            media = [
+                InputMediaPhoto(media=get_poster_input(event_id), caption=caption, parse_mode="HTML")
+                for event_id, caption in posters
+            ]
+            sent_messages = await message.answer_media_group(media)
+            for (event_id, _), sent in zip(posters, sent_messages):
+                remember_poster_file_id(event_id, sent)
+
+        text, keyboard = build_album_summary(chunk, user_id)
         await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
 
 
+def get_album_event_ids(message: Message) -> list[int]:
+    event_ids = []
+    if message.reply_markup is None:
+        return event_ids
+    for row in message.reply_markup.inline_keyboard:
+        for button in row:
+            parts = (button.callback_data or "").split(":")
+            if parts[0].startswith("user_") and len(parts) > 1 and parts[1].isdigit():
+                event_id = int(parts[1])
+                if event_id not in event_ids:
+                    event_ids.append(event_id)
+    return event_ids
+
+
+async def refresh_album_summary(message: Message, user_id: int):
+    event_rows = [row for row in map(get_event_by_id, get_album_event_ids(message)) if row]
+    if not event_rows:
+        await message.edit_text("📭 Ивенты больше недоступны.")
+        return
+    text, keyboard = build_album_summary(event_rows, user_id)
+    await edit_card_in_place(message, text, keyboard)
+
+
+async def refresh_event_card(call: CallbackQuery, event_id: int, text: str, keyboard: InlineKeyboardMarkup | None):
+    # Кнопки из альбомного режима перерисовывают общее сообщение со списком
+    if call.data.endswith(":album"):
+        await refresh_album_summary(call.message, call.from_user.id)
+    else:
+        await update_event_message(call.message, event_id, text, keyboard)
+
+
 async def update_event_message(message: Message, event_id: int, text: str, keyboard: InlineKeyboardMarkup | None):
+    keyboard = keep_carousel_nav(message, event_id, keyboard)
     poster_path = get_poster_path(event_id)
-    if poster_path.exists():
-        if message.photo:
-            await message.edit_caption(text, reply_markup=keyboard, parse_mode="HTML")
-        else:
-            photo = FSInputFile(poster_path)
-            await message.answer_photo(photo, caption=text, reply_markup=keyboard, parse_mode="HTML")
+    if poster_path.exists() == bool(message.photo):
+        await edit_card_in_place(message, text, keyboard)
+        track_card(event_id, message, has_carousel_nav(keyboard))
+    elif poster_path.exists():
+        sent = await message.answer_photo(
+            get_poster_input(event_id), caption=text, reply_markup=keyboard, parse_mode="HTML"
+        )
+        remember_poster_file_id(event_id, sent)
+        remember_rendered_card(sent, text, keyboard)
+        track_card(event_id, sent, has_carousel_nav(keyboard))
     else:
-        if message.photo:
-            await message.delete()
-            await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
-        else:
-            await message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        forget_rendered_card(message)
+        await message.delete()
+        sent = await message.answer(text, reply_markup=keyboard, parse_mode="HTML")
+        remember_rendered_card(sent, text, keyboard)
+        track_card(event_id, sent, has_carousel_nav(keyboard))
 
 
-async def send_reminder_message(bot: Bot, user_id: int, event_id: int, text: str, keyboard: InlineKeyboardMarkup):
+async def send_reminder_message(bot: Bot, user_id: int, event_id: int, text: str, keyboard: InlineKeyboardMarkup) -> bool:
     poster_path = get_poster_path(event_id)
-    if poster_path.exists():
-        photo = FSInputFile(poster_path)
-        await bot.send_photo(user_id, photo, caption=text, reply_markup=keyboard, parse_mode="HTML")
-    else:
+    try:
+        if poster_path.exists():
+            sent = await bot.send_photo(
+                user_id, get_poster_input(event_id), caption=text, reply_markup=keyboard, parse_mode="HTML"
+            )
+            remember_poster_file_id(event_id, sent)
+        else:
+            await bot.send_message(user_id, text, reply_markup=keyboard, parse_mode="HTML")
+    except (TelegramForbiddenError, TelegramBadRequest) as error:
+        if not is_unreachable_chat_error(error):
+            raise
+        # Пользователь заблокировал бота — не пишем ему, пока снова не нажмёт /start
+        set_user_active(user_id, False)
+        logging.info("Пользователь %s недоступен, помечен неактивным", user_id)
+        return False
+    return True
+
+
+async def send_reminder_digest(bot: Bot, user_id: int, event_rows, sent_today: set) -> bool:
+    # Все ивенты пользователя на сегодня: афиши (если включены) + одна сводка с кнопками.
+    # Отправленные афиши отмечаем сразу: если сводка не дойдёт, на следующем тике
+    # повторится только она, а не весь альбом
+    posters = [
+        row[0] for row in event_rows
+        if get_poster_path(row[0]).exists() and ("poster", row[0], user_id) not in sent_today
+    ][:ALBUM_SIZE] if REMINDER_DIGEST_POSTERS else []
+    text, keyboard = build_reminder_digest(event_rows)
+    try:
+        if len(posters) == 1:
+            sent = await bot.send_photo(user_id, get_poster_input(posters[0]))
+            remember_poster_file_id(posters[0], sent)
+        elif posters:
+            sent_messages = await bot.send_media_group(
+                user_id, [InputMediaPhoto(media=get_poster_input(event_id)) for event_id in posters]
+            )
+            for event_id, sent in zip(posters, sent_messages):
+                remember_poster_file_id(event_id, sent)
+        sent_today.update(("poster", event_id, user_id) for event_id in posters)
         await bot.send_message(user_id, text, reply_markup=keyboard, parse_mode="HTML")
+    except (TelegramForbiddenError, TelegramBadRequest) as error:
+        if not is_unreachable_chat_error(error):
+            raise
+        set_user_active(user_id, False)
+        logging.info("Пользователь %s недоступен, помечен неактивным", user_id)
+        return False
+    return True
 
 
-def build_participant_menu(notification_on: bool) -> ReplyKeyboardMarkup:
+def _make_participant_menu(notification_on: bool) -> ReplyKeyboardMarkup:
     notification_button = (
         "Выключить напоминания" if notification_on else "Включить напоминания"
     )
@@ -278,14 +560,25 @@ def build_participant_menu(notification_on: bool) -> ReplyKeyboardMarkup:
         keyboard=[
             [KeyboardButton(text="Ивенты, в которых я участвую")],
             [KeyboardButton(text="Все ивенты")],
+            [KeyboardButton(text="Поиск ивентов")],
             [KeyboardButton(text=notification_button)],
         ],
         resize_keyboard=True,
     )
 
 
-async def send_nearest_event(message: Message):
-    events = get_future_events(limit=1)
+# Меню всего два варианта — собираем их один раз
+PARTICIPANT_MENUS = {flag: _make_participant_menu(flag) for flag in (True, False)}
+
+
+def build_participant_menu(notification_on: bool) -> ReplyKeyboardMarkup:
+    return PARTICIPANT_MENUS[bool(notification_on)]
+
+
+async def send_nearest_event(message: Message, event_id: int | None = None):
+    # event_id приходит из deep link (/start event_<id>), иначе показываем ближайший
+    event_row = catalog.get(event_id) if event_id is not None else None
+    events = [event_row] if event_row else get_future_events(limit=1)
     if not events:
         menu = build_participant_menu(get_user_notification_setting(message.from_user.id))
         await message.answer("📭 Будущих ивентов пока нет.", reply_markup=menu)
@@ -298,13 +591,111 @@ async def send_nearest_event(message: Message):
     await message.answer("Выберите, что хотите посмотреть:", reply_markup=menu)
 
 
+CAROUSEL_NAV_ROW = [
+    ("◀", "user_page:prev:{event_id}"),
+    ("{position} из {total}", "user_page:noop"),
+    ("▶", "user_page:next:{event_id}"),
+]
+# Шаблон карточки -> он же со строкой навигации карусели (карусельный шаблон -> он сам)
+_carousel_templates: dict[KeyboardTemplate, KeyboardTemplate] = {}
+
+
+def add_carousel_nav(event_row, keyboard: InlineKeyboardMarkup | None) -> InlineKeyboardMarkup | None:
+    # «N из M» считается по каталогу при каждой отрисовке, а не копируется со старой карточки.
+    # Клавиатура карусели — тоже шаблон, чтобы её JSON для хэша карточки был готов заранее
+    position, total = get_future_event_position(event_row)
+    if total <= 1:
+        return keyboard
+    rendered = get_template(keyboard) if keyboard else None
+    if rendered is None:
+        nav_row = [
+            InlineKeyboardButton(
+                text=text.format(position=position, total=total), callback_data=callback_data.format(event_id=event_row[0])
+            )
+            for text, callback_data in CAROUSEL_NAV_ROW
+        ]
+        rows = list(keyboard.inline_keyboard) if keyboard else []
+        return InlineKeyboardMarkup(inline_keyboard=[*rows, nav_row])
+
+    template, params = rendered
+    carousel_template = _carousel_templates.get(template)
+    if carousel_template is None:
+        carousel_template = template.with_rows([CAROUSEL_NAV_ROW])
+        _carousel_templates[template] = carousel_template
+        _carousel_templates[carousel_template] = carousel_template
+    return carousel_template.render(**{**params, "position": position, "total": total})
+
+
+def build_carousel_card(event_row, user_id: int):
+    text, keyboard, is_full = build_event_card(event_row, user_id)
+    return text, add_carousel_nav(event_row, keyboard), is_full
+
+
+def has_carousel_nav(keyboard: InlineKeyboardMarkup | None) -> bool:
+    if keyboard is None:
+        return False
+    return any(
+        (button.callback_data or "").startswith("user_page:")
+        for row in keyboard.inline_keyboard
+        for button in row
+    )
+
+
+def keep_carousel_nav(message: Message | None, event_id: int, keyboard: InlineKeyboardMarkup | None) -> InlineKeyboardMarkup | None:
+    # Если карточка показана в карусели, при перерисовке строим навигацию заново
+    if message is None or not has_carousel_nav(message.reply_markup):
+        return keyboard
+    event_row = get_event_by_id(event_id)
+    if event_row is None:
+        return keyboard
+    return add_carousel_nav(event_row, keyboard)
+
+
+async def show_events_carousel(message: Message):
+    events = get_future_events(limit=1)
+    if not events:
+        await message.answer("📭 Будущих ивентов пока нет.")
+        return
+
+    event_row = events[0]
+    text, keyboard, _ = build_carousel_card(event_row, message.from_user.id)
+    await send_event_message(message, event_row[0], text, keyboard)
+
+
+async def edit_carousel_message(message: Message, event_id: int, text: str, keyboard: InlineKeyboardMarkup | None):
+    poster_path = get_poster_path(event_id)
+    if poster_path.exists() and message.photo:
+        media = InputMediaPhoto(media=get_poster_input(event_id), caption=text, parse_mode="HTML")
+        edited = await message.edit_media(media, reply_markup=keyboard)
+        if isinstance(edited, Message):
+            remember_poster_file_id(event_id, edited)
+        remember_rendered_card(message, text, keyboard)
+        track_card(event_id, message, has_carousel_nav(keyboard))
+    elif not poster_path.exists() and not message.photo:
+        await edit_card_in_place(message, text, keyboard)
+        track_card(event_id, message, has_carousel_nav(keyboard))
+    else:
+        # Тип сообщения меняется (фото <-> текст) — отредактировать нельзя, пересылаем
+        forget_rendered_card(message)
+        await message.delete()
+        await send_event_message(message, event_id, text, keyboard)
+
+
 @router.message(lambda msg: msg.text == "Все ивенты")
 async def show_all_events(message: Message):
+    if ALL_EVENTS_VIEW == "carousel":
+        await show_events_carousel(message)
+        return
+
     events = get_future_events()
     if not events:
         await message.answer("📭 Будущих ивентов пока нет.")
         return
 
+    if ALL_EVENTS_VIEW == "album":
+        await send_events_album(message, events)
+        return
+
     for event_row in events:
         text, keyboard, _ = build_event_card(event_row, message.from_user.id)
         await send_event_message(message, event_row[0], text, keyboard)
@@ -317,6 +708,10 @@ async def show_user_events(message: Message):
         await message.answer("📭 Пока нет ивентов, в которых вы участвуете.")
         return
 
+    if USER_EVENTS_VIEW == "album":
+        await send_events_album(message, events)
+        return
+
     for event_row in events:
         text, keyboard, _ = build_event_card(event_row, message.from_user.id)
         await send_event_message(message, event_row[0], text, keyboard)
@@ -345,7 +740,7 @@ async def user_register(call: CallbackQuery):
     if is_full:
         text = format_event_text(event_row, is_full=True)
         keyboard = build_event_keyboard(event_id, call.from_user.id, is_full=True)
-        await update_event_message(call.message, event_id, text, keyboard)
+        await refresh_event_card(call, event_id, text, keyboard)
         await call.answer("Мест нет")
         return
 
@@ -353,6 +748,8 @@ async def user_register(call: CallbackQuery):
         user_name = call.from_user.full_name
         user_nickname = call.from_user.username or ""
         register_user_for_event(event_id, call.from_user.id, user_name, user_nickname)
+        record_stat(event_id, "registrations")
+        mark_event_changed(call.bot, event_id)
         add_log_entry(
             call.from_user.id,
             user_name,
@@ -361,14 +758,16 @@ async def user_register(call: CallbackQuery):
         )
 
     text, keyboard, _ = build_event_card(event_row, call.from_user.id)
-    await update_event_message(call.message, event_id, text, keyboard)
+    await refresh_event_card(call, event_id, text, keyboard)
     await call.answer("Записано")
 
 
 @router.callback_query(lambda c: c.data.startswith("user_cancel:"))
 async def user_cancel(call: CallbackQuery):
     event_id = int(call.data.split(":")[1])
-    cancel_user_registration(event_id, call.from_user.id)
+    if cancel_user_registration(event_id, call.from_user.id):
+        record_stat(event_id, "cancellations")
+        mark_event_changed(call.bot, event_id)
     event_row = get_event_by_id(event_id)
     if not event_row:
         await call.answer("Ивент не найден", show_alert=True)
@@ -382,25 +781,69 @@ async def user_cancel(call: CallbackQuery):
     )
 
     text, keyboard, _ = build_event_card(event_row, call.from_user.id)
-    await update_event_message(call.message, event_id, text, keyboard)
+    await refresh_event_card(call, event_id, text, keyboard)
     await call.answer("Регистрация отменена")
 
 
+@router.callback_query(lambda c: c.data.startswith("user_page:"))
+async def user_page(call: CallbackQuery):
+    parts = call.data.split(":")
+    if parts[1] == "noop":
+        await call.answer()
+        return
+
+    direction, event_id = parts[1], int(parts[2])
+    event_row = get_adjacent_future_event(event_id, direction)
+    if not event_row:
+        await call.answer("Это последний ивент" if direction == "next" else "Это первый ивент")
+        return
+
+    text, keyboard, _ = build_carousel_card(event_row, call.from_user.id)
+    await edit_carousel_message(call.message, event_row[0], text, keyboard)
+    await call.answer()
+
+
 def build_reminder_text(event_row) -> str:
     return f"Напоминаем о событии сегодня!\n\n{format_event_text(event_row, is_full=False)}"
 
 
+REMINDER_KB = KeyboardTemplate([
+    [("Отписаться", "reminder_unsubscribe:{event_id}")],
+    [("Выключить уведомления", "reminder_disable_notifications")],
+])
+
+
 def build_reminder_keyboard(event_id: int) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [InlineKeyboardButton(text="Отписаться", callback_data=f"reminder_unsubscribe:{event_id}")],
-            [InlineKeyboardButton(text="Выключить уведомления", callback_data="reminder_disable_notifications")],
-        ]
-    )
+    return REMINDER_KB.render(event_id=event_id)
+
+
+def build_reminder_digest(event_rows) -> tuple[str, InlineKeyboardMarkup]:
+    # Без описаний: сводка из нескольких ивентов должна уместиться в одно сообщение
+    lines = ["Напоминаем о событиях сегодня!"]
+    rows = []
+    for number, (event_id, name, _, price, address, _, _, time_str) in enumerate(event_rows, start=1):
+        lines.append(f"\n<b>{number}. {name}</b>\n⏰ {time_str} 🏠 {address}\n💰 Цена: {price}")
+        rows.append([InlineKeyboardButton(
+            text=f"Отписаться: {number}. {name}", callback_data=f"reminder_unsubscribe:{event_id}:digest"
+        )])
+    rows.append([InlineKeyboardButton(text="Выключить уведомления", callback_data="reminder_disable_notifications")])
+    return "\n".join(lines), InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+def get_digest_event_ids(message: Message) -> list[int]:
+    # Какие ивенты ещё остались в сводке — по её кнопкам отписки
+    event_ids = []
+    if message.reply_markup is None:
+        return event_ids
+    for row in message.reply_markup.inline_keyboard:
+        for button in row:
+            if button.callback_data and button.callback_data.startswith("reminder_unsubscribe:"):
+                event_ids.append(int(button.callback_data.split(":")[1]))
+    return event_ids
 
 
 def get_today_event_participants():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -413,6 +856,7 @@ def get_today_event_participants():
         WHERE e.is_deleted = 0
           AND date(e.event_date) = date('now')
           AND u.notification_on = 1
+          AND u.active = 1
         ORDER BY e.event_date, e.event_time
         """
     )
@@ -440,6 +884,10 @@ async def send_event_reminders(bot: Bot):
 
     today_key = now.strftime("%Y-%m-%d")
     sent_today = _sent_reminders.setdefault(today_key, set())
+    if REMINDER_DIGEST:
+        await send_reminder_digests(bot, sent_today)
+        return
+
     for row in get_today_event_participants():
         event_id = row[0]
         user_id = row[8]
@@ -449,10 +897,37 @@ async def send_event_reminders(bot: Bot):
 
         text = build_reminder_text(row[:8])
         keyboard = build_reminder_keyboard(event_id)
-        await send_reminder_message(bot, user_id, event_id, text, keyboard)
+        try:
+            await send_reminder_message(bot, user_id, event_id, text, keyboard)
+        except Exception:
+            # Ошибка одного получателя не должна обрывать всю рассылку напоминаний
+            logging.exception("Не удалось отправить напоминание пользователю %s", user_id)
+            continue
         sent_today.add(reminder_key)
 
 
+async def send_reminder_digests(bot: Bot, sent_today: set):
+    # Строки уже отсортированы по времени — у каждого пользователя ивенты идут по порядку
+    events_by_user: dict[int, list] = {}
+    for row in get_today_event_participants():
+        if (row[0], row[8]) not in sent_today:
+            events_by_user.setdefault(row[8], []).append(row[:8])
+
+    for user_id, event_rows in events_by_user.items():
+        try:
+            if len(event_rows) == 1:
+                event_id = event_rows[0][0]
+                await send_reminder_message(
+                    bot, user_id, event_id, build_reminder_text(event_rows[0]), build_reminder_keyboard(event_id)
+                )
+            else:
+                await send_reminder_digest(bot, user_id, event_rows, sent_today)
+        except Exception:
+            logging.exception("Не удалось отправить напоминание пользователю %s", user_id)
+            continue
+        sent_today.update((event_row[0], user_id) for event_row in event_rows)
+
+
 async def reminder_loop(bot: Bot):
     while True:
         now = datetime.now()
@@ -462,14 +937,16 @@ async def reminder_loop(bot: Bot):
         try:
             await send_event_reminders(bot)
         except Exception:
-            pass
+            logging.exception("Ошибка при отправке напоминаний")
         await asyncio.sleep(REMINDER_CHECK_INTERVAL_SECONDS)
 
 
 @router.callback_query(lambda c: c.data.startswith("reminder_unsubscribe:"))
 async def reminder_unsubscribe(call: CallbackQuery):
     event_id = int(call.data.split(":")[1])
-    cancel_user_registration(event_id, call.from_user.id)
+    if cancel_user_registration(event_id, call.from_user.id):
+        record_stat(event_id, "unsubscribes")
+        mark_event_changed(call.bot, event_id)
     event_row = get_event_by_id(event_id)
     if not event_row:
         await call.answer("Ивент не найден", show_alert=True)
@@ -482,6 +959,22 @@ async def reminder_unsubscribe(call: CallbackQuery):
         f"Отписка от напоминания на ивент «{event_row[1]}»",
     )
 
+    if call.data.endswith(":digest"):
+        # В сводке убираем только этот ивент, остальные напоминания остаются
+        event_ids = [other_id for other_id in get_digest_event_ids(call.message) if other_id != event_id]
+        event_rows = [row for row in (get_event_by_id(other_id) for other_id in event_ids) if row]
+        if event_rows:
+            text, keyboard = build_reminder_digest(event_rows)
+        else:
+            text, keyboard = "Вы отписались от всех сегодняшних ивентов.", None
+        try:
+            await call.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
+        except TelegramBadRequest as error:
+            if "message is not modified" not in str(error):
+                raise
+        await call.answer("Вы отписались")
+        return
+
     text, keyboard, _ = build_event_card(event_row, call.from_user.id)
     await update_event_message(call.message, event_id, text, keyboard)
     await call.answer("Вы отписались")
@@ -0,0 +1,154 @@
+import cProfile
+import logging
+import pstats
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message, TelegramObject
+
+from bot_api import build_api_report, reset_api_stats
+from query_log import build_query_report, reset_query_stats
+from tenants import ADMINS
+
+PROFILE_DIR = Path(__file__).resolve().parent / "profiles"
+router = Router()
+
+SLOW_UPDATE_THRESHOLD_SECONDS = 1.0
+PROFILE_TOP_FUNCTIONS = 5
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class ProfilingSettings:
+    def __init__(self):
+        # Доля апдейтов, которые профилируются (0 — выключено)
+        self.sample_ratio = 0.0
+        # Имена хендлеров, которые профилируются всегда
+        self.handlers: set[str] = set()
+
+
+settings = ProfilingSettings()
+
+
+def get_route_name(data: dict[str, Any]) -> str:
+    handler = data.get("handler")
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unknown"
+    return f"{callback.__module__}.{callback.__qualname__}"
+
+
+def format_hotspots(profiler: cProfile.Profile, limit: int = PROFILE_TOP_FUNCTIONS) -> str:
+    stats = pstats.Stats(profiler)
+    # Горячие точки — функции с наибольшим собственным временем
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return "; ".join(
+        f"{Path(filename).name}:{line}({function}) {own_time * 1000:.1f}ms/{calls}"
+        for (filename, line, function), (_, calls, own_time, _, _) in rows
+    )
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    # Inner-middleware: к этому моменту известен хендлер, поэтому пишем имя маршрута.
+    # cProfile в asyncio захватывает и чужие корутины, работающие между await,
+    # поэтому одновременно профилируется не больше одного апдейта.
+    def __init__(self):
+        self._busy = False
+
+    def _should_profile(self, route: str) -> bool:
+        if self._busy:
+            return False
+        if route.rsplit(".", 1)[-1] in settings.handlers:
+            return True
+        return settings.sample_ratio > 0 and random.random() < settings.sample_ratio
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        route = get_route_name(data)
+        profiler = None
+        if self._should_profile(route):
+            self._busy = True
+            profiler = cProfile.Profile()
+
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            return await handler(event, data)
+        finally:
+            duration = time.perf_counter() - started
+            if profiler:
+                profiler.disable()
+                self._busy = False
+                self._dump(profiler, route, duration)
+            elif duration >= SLOW_UPDATE_THRESHOLD_SECONDS:
+                logging.warning("Медленный апдейт %s: %.0f мс", route, duration * 1000)
+
+    def _dump(self, profiler: cProfile.Profile, route: str, duration: float):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = PROFILE_DIR / f"{stamp}-{route.rsplit('.', 1)[-1]}.pstats"
+        profiler.dump_stats(path)
+        if duration >= SLOW_UPDATE_THRESHOLD_SECONDS:
+            logging.warning(
+                "Медленный апдейт %s: %.0f мс, профиль %s. Горячие точки: %s",
+                route, duration * 1000, path.name, format_hotspots(profiler),
+            )
+
+
+@router.message(Command("profile"))
+async def profile_command(message: Message, command: CommandObject):
+    # /profile 0.1 — доля апдейтов, /profile user_register — конкретный хендлер,
+    # /profile off — выключить всё
+    if message.from_user.id not in ADMINS:
+        return
+
+    args = (command.args or "").strip()
+    if args == "off":
+        settings.sample_ratio = 0.0
+        settings.handlers.clear()
+    elif args:
+        try:
+            settings.sample_ratio = min(1.0, max(0.0, float(args)))
+        except ValueError:
+            settings.handlers.symmetric_difference_update({args})
+
+    handlers = ", ".join(sorted(settings.handlers)) or "—"
+    await message.answer(
+        f"⏱ Профилирование\n"
+        f"Доля апдейтов: {settings.sample_ratio:.0%}\n"
+        f"Хендлеры: {handlers}\n"
+        f"Порог медленного апдейта: {SLOW_UPDATE_THRESHOLD_SECONDS:.1f} с"
+    )
+
+
+@router.message(Command("queries"))
+async def queries_command(message: Message, command: CommandObject):
+    # /queries — отчёт по самым затратным SQL-запросам, /queries reset — обнулить
+    if message.from_user.id not in ADMINS:
+        return
+
+    if (command.args or "").strip() == "reset":
+        reset_query_stats()
+        await message.answer("🧹 Статистика запросов сброшена.")
+        return
+
+    await message.answer(build_query_report()[:4096])
+
+
+@router.message(Command("api"))
+async def api_command(message: Message, command: CommandObject):
+    # /api — счётчики повторов и сбоев вызовов Bot API, /api reset — обнулить
+    if message.from_user.id not in ADMINS:
+        return
+
+    if (command.args or "").strip() == "reset":
+        reset_api_stats()
+        await message.answer("🧹 Статистика Bot API сброшена.")
+        return
+
+    await message.answer(build_api_report())
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+SLOW_QUERY_THRESHOLD_MS = 50.0
+REPORT_LIMIT = 10
+EXPLAINABLE_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+class QueryStats:
+    def __init__(self):
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.plan: list[str] | None = None
+
+    @property
+    def full_scan(self) -> bool:
+        # «SCAN <таблица>» без индекса — полный проход по таблице
+        return any(
+            line.startswith("SCAN ") and "INDEX" not in line
+            for line in self.plan or []
+        )
+
+
+_stats: dict[str, QueryStats] = {}
+_lock = threading.Lock()
+
+
+def normalize_sql(sql: str) -> str:
+    sql = _STRING_LITERAL_RE.sub("?", sql)
+    sql = _NUMBER_LITERAL_RE.sub("?", sql)
+    sql = _WHITESPACE_RE.sub(" ", sql).strip()
+    # IN (?, ?, ?) разной длины — это один и тот же запрос
+    return _IN_LIST_RE.sub("(?...)", sql)
+
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(sql, parameters, started)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        # Параметры нужны и для EXPLAIN, поэтому итератор превращаем в список
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(sql, seq_of_parameters[0] if seq_of_parameters else (), started)
+
+    def _record(self, sql: str, parameters, started: float):
+        duration_ms = (time.perf_counter() - started) * 1000
+        normalized = normalize_sql(sql)
+        with _lock:
+            stats = _stats.setdefault(normalized, QueryStats())
+            stats.calls += 1
+            stats.total_ms += duration_ms
+            stats.max_ms = max(stats.max_ms, duration_ms)
+            need_plan = duration_ms >= SLOW_QUERY_THRESHOLD_MS and stats.plan is None
+        if not need_plan:
+            return
+
+        stats.plan = self._explain(sql, parameters)
+        logging.warning(
+            "Медленный запрос %.1f мс: %s\nПлан: %s",
+            duration_ms, normalized, " | ".join(stats.plan) or "—",
+        )
+
+    def _explain(self, sql: str, parameters) -> list[str]:
+        if not sql.lstrip().upper().startswith(EXPLAINABLE_STATEMENTS):
+            return []
+        try:
+            # Обычный курсор, чтобы EXPLAIN не попадал в статистику сам
+            rows = sqlite3.Cursor(self.connection).execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        except sqlite3.Error as error:
+            return [f"EXPLAIN не удался: {error}"]
+        return [row[-1] for row in rows]
+
+
+class TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database, **kwargs) -> sqlite3.Connection:
+    return sqlite3.connect(database, factory=TracedConnection, **kwargs)
+
+
+def build_query_report(limit: int = REPORT_LIMIT) -> str:
+    with _lock:
+        items = sorted(_stats.items(), key=lambda item: item[1].total_ms, reverse=True)[:limit]
+    if not items:
+        return "Запросов пока не было."
+
+    lines = ["🐢 Самые затратные запросы (по суммарному времени):"]
+    for sql, stats in items:
+        flag = " ⚠️ FULL SCAN" if stats.full_scan else ""
+        lines.append(
+            f"\n• {stats.calls} вызовов, всего {stats.total_ms:.0f} мс, "
+            f"среднее {stats.total_ms / stats.calls:.1f} мс, макс {stats.max_ms:.1f} мс{flag}\n"
+            f"{sql[:300]}"
+        )
+        if stats.plan:
+            lines.append("План: " + " | ".join(stats.plan))
+    return "\n".join(lines)
+
+
+def reset_query_stats():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import gzip
+import itertools
+import json
+import logging
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.filters import Command, CommandObject
+from aiogram.methods import GetFile, GetMe, SendMediaGroup, TelegramMethod
+from aiogram.types import Chat, File, Message, PhotoSize, TelegramObject, Update, User
+
+from profiling import get_route_name
+from tenants import ADMINS, Tenant, get_tenant, override_tenant
+
+BASE_DIR = Path(__file__).resolve().parent
+RECORDINGS_DIR = BASE_DIR / "recordings"
+router = Router()
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+# Поля с персональными данными, которые заменяются при анонимизации
+ANONYMIZED_NAME_FIELDS = ("first_name", "last_name", "username", "title")
+ANONYMIZED_ID_OWNERS = ("from", "chat", "user", "sender_chat")
+ANONYMIZED_ID_START = 7_000_000_000
+
+
+# --- Запись ---
+
+class Anonymizer:
+    # Один и тот же пользователь в пределах записи получает один и тот же
+    # псевдоним, иначе FSM и регистрации при воспроизведении разъедутся.
+    # Админы остаются как есть: без их id админские сценарии не воспроизвести.
+    def __init__(self):
+        self._ids: dict[int, int] = {}
+        self._next_ids = itertools.count(ANONYMIZED_ID_START)
+
+    def _map_id(self, real_id: int) -> int:
+        if abs(real_id) in ADMINS:
+            return real_id
+        if real_id not in self._ids:
+            fake_id = next(self._next_ids)
+            self._ids[real_id] = -fake_id if real_id < 0 else fake_id
+        return self._ids[real_id]
+
+    def _scrub_owner(self, owner: dict):
+        if isinstance(owner.get("id"), int):
+            owner["id"] = self._map_id(owner["id"])
+        for field in ANONYMIZED_NAME_FIELDS:
+            if field in owner:
+                owner[field] = f"{field}_{abs(owner.get('id', 0))}"
+
+    def scrub(self, payload):
+        if isinstance(payload, dict):
+            for key, value in payload.items():
+                if key in ANONYMIZED_ID_OWNERS and isinstance(value, dict):
+                    self._scrub_owner(value)
+                self.scrub(value)
+        elif isinstance(payload, list):
+            for item in payload:
+                self.scrub(item)
+        return payload
+
+
+class UpdateRecorder(BaseMiddleware):
+    # Outer-middleware на dp.update: пишет апдейты в gzip-JSONL,
+    # по строке на апдейт со смещением от начала записи
+    def __init__(self):
+        self.path: Path | None = None
+        self._file = None
+        self._started = 0.0
+        self._anonymizer: Anonymizer | None = None
+        self.recorded = 0
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    def start(self, anonymize: bool = False) -> Path:
+        self.stop()
+        RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.path = RECORDINGS_DIR / f"updates-{stamp}.jsonl.gz"
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._started = time.monotonic()
+        self._anonymizer = Anonymizer() if anonymize else None
+        self.recorded = 0
+        return self.path
+
+    def stop(self) -> Path | None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return self.path
+
+    def _write(self, update: Update):
+        payload = update.model_dump(mode="json", exclude_none=True, by_alias=True)
+        if self._anonymizer is not None:
+            self._anonymizer.scrub(payload)
+        record = {"t": round(time.monotonic() - self._started, 3), "update": payload}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.recorded += 1
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        if self._file is not None and isinstance(event, Update):
+            try:
+                self._write(event)
+            except Exception:
+                logging.exception("Не удалось записать апдейт, запись остановлена")
+                self.stop()
+        return await handler(event, data)
+
+
+recorder = UpdateRecorder()
+
+
+@router.message(Command("record"))
+async def record_command(message: Message, command: CommandObject):
+    # /record — начать запись, /record anon — с анонимизацией, /record off — остановить
+    if message.from_user.id not in ADMINS:
+        return
+
+    args = (command.args or "").strip()
+    if args == "off":
+        path = recorder.stop()
+        if path is None:
+            await message.answer("Запись не велась.")
+        else:
+            await message.answer(f"⏹ Запись остановлена: {path.name}, апдейтов: {recorder.recorded}")
+        return
+
+    path = recorder.start(anonymize=args == "anon")
+    await message.answer(
+        f"⏺ Пишу апдейты в {path.name}"
+        + (" (с анонимизацией)" if args == "anon" else "")
+    )
+
+
+def read_recording(path: Path) -> list[tuple[float, dict]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    return [(record["t"], record["update"]) for record in records]
+
+
+# --- Воспроизведение ---
+
+class FakeSession(BaseSession):
+    # Ничего не отправляет в Telegram: на каждый метод возвращает
+    # правдоподобный ответ нужного типа и считает вызовы
+    def __init__(self, api_latency: float = 0.0):
+        super().__init__()
+        self.api_latency = api_latency
+        self.calls: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self):
+        pass
+
+    async def stream_content(
+        self, url: str, headers: dict[str, Any] | None = None, timeout: int = 30,
+        chunk_size: int = 65536, raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None):
+        self.calls[type(method).__name__] += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        return self._fake_result(bot, method)
+
+    def _fake_message(self, method: TelegramMethod, photo: bool = False) -> Message:
+        message_id = next(self._message_ids)
+        return Message(
+            message_id=message_id,
+            date=datetime.now(),
+            chat=Chat(id=int(getattr(method, "chat_id", 0) or 0), type="private"),
+            text=getattr(method, "text", None),
+            photo=[PhotoSize(
+                file_id=f"replay-photo-{message_id}", file_unique_id=f"replay-{message_id}",
+                width=1, height=1,
+            )] if photo else None,
+        )
+
+    def _fake_result(self, bot: Bot, method: TelegramMethod):
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="Replay", username="replay_bot")
+        if isinstance(method, GetFile):
+            return File(file_id=method.file_id, file_unique_id=method.file_id, file_path=f"replay/{method.file_id}")
+        if isinstance(method, SendMediaGroup):
+            return [self._fake_message(method, photo=True) for _ in method.media]
+
+        returning = method.__returning__
+        if returning is Message:
+            return self._fake_message(method, photo=hasattr(method, "photo"))
+        # edit_* возвращают Message | bool, answer_*/delete_* — bool
+        return True
+
+
+_current_routes: contextvars.ContextVar[list[str]] = contextvars.ContextVar("replay_routes")
+
+
+class RouteCaptureMiddleware(BaseMiddleware):
+    # Inner-middleware: запоминает, какой хендлер обработал апдейт
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        routes = _current_routes.get(None)
+        if routes is not None:
+            routes.append(get_route_name(data).rsplit(".", 1)[-1])
+        return await handler(event, data)
+
+
+def prepare_sandbox(sandbox_dir: Path, source: Tenant, db_path: Path | None = None) -> Tenant:
+    # Копия data.db и афиш в отдельной площадке: все TenantPath модулей (БД, афиши,
+    # бэкапы, билеты) указывают внутрь песочницы, а не на рабочий каталог
+    sandbox_db = sandbox_dir / "data.db"
+    source_db = sqlite3.connect(db_path or source.data_dir / "data.db")
+    target = sqlite3.connect(sandbox_db)
+    try:
+        source_db.backup(target)
+    finally:
+        target.close()
+        source_db.close()
+
+    source_pics = source.data_dir / "pics"
+    if source_pics.exists():
+        shutil.copytree(source_pics, sandbox_dir / "pics")
+    else:
+        (sandbox_dir / "pics").mkdir()
+
+    return Tenant(name=f"replay-{source.name}", token=source.token, admins=list(source.admins), data_dir=sandbox_dir)
+
+
+class ReplayReport:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.wall_time = 0.0
+
+    def add(self, route: str, latency: float, failed: bool):
+        self.latencies[route].append(latency)
+        if failed:
+            self.errors[route] += 1
+
+    def format(self, api_calls: Counter[str]) -> str:
+        total = sum(len(values) for values in self.latencies.values())
+        throughput = total / self.wall_time if self.wall_time else 0.0
+        lines = [
+            f"Апдейтов: {total}, время: {self.wall_time:.2f} с, "
+            f"пропускная способность: {throughput:.1f} апд/с, ошибок: {sum(self.errors.values())}",
+            "",
+            f"{'маршрут':<36} {'кол-во':>7} {'p50 мс':>8} {'p95 мс':>8} {'max мс':>8} {'ошибки':>7}",
+        ]
+        for route, values in sorted(self.latencies.items(), key=lambda item: -sum(item[1])):
+            values_ms = sorted(value * 1000 for value in values)
+            p95 = values_ms[min(len(values_ms) - 1, int(len(values_ms) * 0.95))]
+            lines.append(
+                f"{route:<36} {len(values_ms):>7} {statistics.median(values_ms):>8.1f} "
+                f"{p95:>8.1f} {values_ms[-1]:>8.1f} {self.errors[route]:>7}"
+            )
+        lines.append("")
+        lines.append("Вызовы Bot API: " + ", ".join(
+            f"{name}={count}" for name, count in api_calls.most_common()
+        ))
+        return "\n".join(lines)
+
+
+async def replay(recording: Path, speed: float = 1.0, api_latency: float = 0.0, db_path: Path | None = None) -> str:
+    # speed=1 — исходный темп, 2 — вдвое быстрее, 0 — без пауз
+    import main
+
+    records = read_recording(recording)
+    session = FakeSession(api_latency=api_latency)
+    bot = Bot(token=get_tenant().token, session=session)
+    report = ReplayReport()
+
+    route_capture = RouteCaptureMiddleware()
+    for observer in (main.dp.message, main.dp.callback_query, main.dp.inline_query):
+        observer.middleware(route_capture)
+
+    async def feed(update_payload: dict):
+        routes: list[str] = []
+        _current_routes.set(routes)
+        update = Update.model_validate(update_payload, context={"bot": bot})
+        started = time.perf_counter()
+        failed = False
+        try:
+            await main.dp.feed_update(bot, update)
+        except Exception:
+            failed = True
+            logging.exception("Ошибка при обработке апдейта %s", update.update_id)
+        report.add(routes[-1] if routes else "unhandled", time.perf_counter() - started, failed)
+
+    # Троттлинг и сброс перегрузки отбрасывали бы быстрые нажатия из записи
+    # (а при --speed 0 — почти всё), искажая замер
+    main.throttling.enabled = False
+    max_pending, main.ordering.max_pending = main.ordering.max_pending, sys.maxsize
+    try:
+        with tempfile.TemporaryDirectory(prefix="replay-") as sandbox_dir:
+            sandbox = prepare_sandbox(Path(sandbox_dir), get_tenant(), db_path)
+            with override_tenant(sandbox):
+                tasks = []
+                started = time.monotonic()
+                for offset, update_payload in records:
+                    if speed > 0:
+                        delay = offset / speed - (time.monotonic() - started)
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                    # Как и при polling, апдейты обрабатываются конкурентно
+                    tasks.append(asyncio.create_task(feed(update_payload)))
+                await asyncio.gather(*tasks)
+                report.wall_time = time.monotonic() - started
+    finally:
+        main.throttling.enabled = True
+        main.ordering.max_pending = max_pending
+
+    return report.format(session.calls)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных апдейтов на копии data.db")
+    parser.add_argument("recording", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 — исходный темп, 0 — максимально быстро")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="имитация задержки Bot API")
+    parser.add_argument("--db", type=Path, default=None, help="исходная БД (по умолчанию data.db)")
+    args = parser.parse_args()
+
+    path = args.recording if args.recording.exists() else RECORDINGS_DIR / args.recording
+    print(asyncio.run(replay(path, args.speed, args.api_latency_ms / 1000, args.db)))
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from config import ADMINS as MAIN_ADMINS, BASE_DIR, BOT_TOKEN
+
+# Дополнительные площадки: [{"name": ..., "token": ..., "admins": [...], "data_dir": ...}]
+TENANTS_PATH = BASE_DIR / "tenants.json"
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Tenant:
+    name: str
+    token: str
+    admins: list[int]
+    # Здесь лежат data.db, pics/ и backups/ площадки
+    data_dir: Path
+    # Кэши модулей (каталог ивентов, file_id афиш и т.п.) — свои у каждой площадки
+    state: dict[int, Any] = field(default_factory=dict, repr=False)
+
+    @property
+    def bot_id(self) -> int:
+        return int(self.token.split(":", 1)[0])
+
+
+def load_tenants() -> list[Tenant]:
+    # Основная площадка — как и раньше, из config.py и файлов рядом с ботом
+    tenants = [Tenant(name="main", token=BOT_TOKEN, admins=list(MAIN_ADMINS), data_dir=BASE_DIR)]
+    if TENANTS_PATH.exists():
+        for item in json.loads(TENANTS_PATH.read_text(encoding="utf-8")):
+            data_dir = Path(item.get("data_dir") or BASE_DIR / "tenants" / item["name"])
+            tenants.append(Tenant(
+                name=item["name"],
+                token=item["token"],
+                admins=[int(admin_id) for admin_id in item.get("admins", [])],
+                data_dir=data_dir if data_dir.is_absolute() else BASE_DIR / data_dir,
+            ))
+    return tenants
+
+
+TENANTS = load_tenants()
+_tenants_by_bot_id = {tenant.bot_id: tenant for tenant in TENANTS}
+current_tenant: contextvars.ContextVar[Tenant] = contextvars.ContextVar("current_tenant")
+
+
+def get_tenant() -> Tenant:
+    # Вне апдейта и фоновых задач (CLI, миграции) работаем с основной площадкой
+    return current_tenant.get(TENANTS[0])
+
+
+def get_tenant_by_name(name: str) -> Tenant:
+    for tenant in TENANTS:
+        if tenant.name == name:
+            return tenant
+    raise KeyError(f"Площадка {name} не найдена в tenants.json")
+
+
+async def run_for_tenant(tenant: Tenant, awaitable: Awaitable):
+    # Фоновые циклы (напоминания, серии, архив, бэкапы) запускаются по одному на площадку
+    token = current_tenant.set(tenant)
+    try:
+        return await awaitable
+    finally:
+        current_tenant.reset(token)
+
+
+@contextmanager
+def override_tenant(tenant: Tenant):
+    # Апдейты бота tenant.bot_id и код внутри блока работают с площадкой tenant
+    # (песочница replay.py) вместо настоящей площадки этого бота
+    previous = _tenants_by_bot_id.get(tenant.bot_id)
+    _tenants_by_bot_id[tenant.bot_id] = tenant
+    token = current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        current_tenant.reset(token)
+        if previous is None:
+            del _tenants_by_bot_id[tenant.bot_id]
+        else:
+            _tenants_by_bot_id[tenant.bot_id] = previous
+
+
+class TenantMiddleware(BaseMiddleware):
+    # Outer-middleware на dp.update, должен стоять первым: остальные
+    # middleware и хендлеры уже видят площадку того бота, которому пришёл апдейт
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        tenant = _tenants_by_bot_id.get(data["bot"].id, TENANTS[0])
+        token = current_tenant.set(tenant)
+        try:
+            return await handler(event, data)
+        finally:
+            current_tenant.reset(token)
+
+
+class TenantPath(os.PathLike):
+    # Путь внутри каталога текущей площадки. Модули держат его в DB_PATH/PICS_DIR
+    # как обычный Path: connect(DB_PATH), PICS_DIR / "1.png", PICS_DIR.mkdir() и т.д.
+    def __init__(self, *parts: str):
+        self.parts = parts
+
+    def resolve_path(self) -> Path:
+        return get_tenant().data_dir.joinpath(*self.parts)
+
+    def __fspath__(self) -> str:
+        return str(self.resolve_path())
+
+    def __truediv__(self, other) -> Path:
+        return self.resolve_path() / other
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve_path(), name)
+
+    def __str__(self) -> str:
+        return str(self.resolve_path())
+
+    def __repr__(self) -> str:
+        return f"TenantPath({'/'.join(self.parts)!r})"
+
+
+class TenantAdmins:
+    # Список админов текущей площадки: `user_id in ADMINS`
+    def __contains__(self, user_id) -> bool:
+        return user_id in get_tenant().admins
+
+    def __iter__(self):
+        return iter(get_tenant().admins)
+
+    def __len__(self) -> int:
+        return len(get_tenant().admins)
+
+
+ADMINS = TenantAdmins()
+
+
+class TenantLocal:
+    # Модульный кэш, отдельный для каждой площадки: ведёт себя как объект,
+    # который вернула factory, но экземпляр свой у каждой площадки
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+
+    def resolve(self):
+        state = get_tenant().state
+        key = id(self)
+        if key not in state:
+            state[key] = self._factory()
+        return state[key]
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+    def __getitem__(self, key):
+        return self.resolve()[key]
+
+    def __setitem__(self, key, value):
+        self.resolve()[key] = value
+
+    def __delitem__(self, key):
+        del self.resolve()[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.resolve()
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __len__(self) -> int:
+        return len(self.resolve())
+
+    def __bool__(self) -> bool:
+        return bool(self.resolve())
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import importlib.util
+import io
+import logging
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from aiogram import Bot, Router
+from aiogram.types import CallbackQuery, FSInputFile, Message
+
+from query_log import connect
+from tenants import TenantPath
+
+# Необязательная зависимость: pip install "qrcode[pil]". Без неё (или без Pillow,
+# через который qrcode рисует PNG) билет выдаётся ссылкой, а не картинкой
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+if importlib.util.find_spec("PIL") is None:
+    qrcode = None
+
+DB_PATH = TenantPath("data.db")
+TICKETS_DIR = TenantPath("tickets")
+TICKET_SECRET_PATH = TenantPath("ticket_secret")
+router = Router()
+
+TICKETS_AHEAD_DAYS = 1
+TICKETS_CHECK_INTERVAL_SECONDS = 30 * 60
+TICKETS_WORKERS = 2
+CHECKIN_PREFIX = "checkin_"
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def qr_available() -> bool:
+    return qrcode is not None
+
+
+def get_ticket_secret() -> bytes:
+    # Свой ключ у каждой площадки; создаётся при первом обращении
+    if not TICKET_SECRET_PATH.exists():
+        TICKET_SECRET_PATH.parent.mkdir(parents=True, exist_ok=True)
+        TICKET_SECRET_PATH.write_bytes(secrets.token_bytes(32))
+    return TICKET_SECRET_PATH.read_bytes()
+
+
+def make_ticket_token(secret: bytes, event_id: int, user_id: int) -> str:
+    # 22 символа base64url — укладывается в параметр /start (до 64 символов [A-Za-z0-9_-])
+    digest = hmac.new(secret, f"{event_id}:{user_id}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode()
+
+
+def get_checkin_link(bot_username: str, token: str) -> str:
+    return f"https://t.me/{bot_username}?start={CHECKIN_PREFIX}{token}"
+
+
+def parse_checkin_token(args: str | None) -> str | None:
+    if args and args.startswith(CHECKIN_PREFIX):
+        return args[len(CHECKIN_PREFIX):] or None
+    return None
+
+
+def get_ticket_image_path(event_id: int, token: str):
+    return TICKETS_DIR / str(event_id) / f"{token}.png"
+
+
+# --- БД ---
+
+def issue_event_tickets(event_id: int) -> list[tuple[str, int, str | None]]:
+    # Билеты для всех записавшихся, у кого их ещё нет, — одной транзакцией
+    secret = get_ticket_secret()
+    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = connect(DB_PATH)
+    with conn:
+        missing = conn.execute(
+            """
+            SELECT r.user_id, r.user_name, r.user_nickname
+            FROM registrations r
+            LEFT JOIN tickets t ON t.event_id = r.event_id AND t.user_id = r.user_id
+            WHERE r.event_id = ? AND t.token IS NULL
+            """,
+            (event_id,),
+        ).fetchall()
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO tickets (token, event_id, user_id, user_name, user_nickname, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (make_ticket_token(secret, event_id, user_id), event_id, user_id, user_name, user_nickname, created_at)
+                for user_id, user_name, user_nickname in missing
+            ],
+        )
+    rows = conn.execute(
+        "SELECT token, user_id, file_id FROM tickets WHERE event_id = ?",
+        (event_id,),
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def get_user_ticket(event_id: int, user_id: int) -> tuple[str, str | None] | None:
+    conn = connect(DB_PATH)
+    row = conn.execute(
+        "SELECT token, file_id FROM tickets WHERE event_id = ? AND user_id = ?",
+        (event_id, user_id),
+    ).fetchone()
+    conn.close()
+    if row is None:
+        # Запись могла появиться уже после пакетной генерации
+        for token, ticket_user_id, file_id in issue_event_tickets(event_id):
+            if ticket_user_id == user_id:
+                return token, file_id
+    return row
+
+
+def set_ticket_file_id(token: str, file_id: str):
+    conn = connect(DB_PATH)
+    with conn:
+        conn.execute("UPDATE tickets SET file_id = ? WHERE token = ?", (file_id, token))
+    conn.close()
+
+
+def check_in_ticket(token: str, admin_id: int):
+    # Поиск по первичному ключу; повторный скан того же билета ничего не меняет
+    checked_in_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = connect(DB_PATH)
+    with conn:
+        row = conn.execute(
+            """
+            SELECT t.user_name, t.user_nickname, t.checked_in_at, e.name, e.event_date
+            FROM tickets t
+            JOIN events e ON e.event_id = t.event_id
+            WHERE t.token = ? AND e.is_deleted = 0
+            """,
+            (token,),
+        ).fetchone()
+        first_time = row is not None and conn.execute(
+            """
+            UPDATE tickets SET checked_in_at = ?, checked_in_by = ?
+            WHERE token = ? AND checked_in_at IS NULL
+            """,
+            (checked_in_at, admin_id, token),
+        ).rowcount > 0
+    conn.close()
+    return row, first_time
+
+
+def get_upcoming_event_ids() -> list[int]:
+    until = (datetime.now() + timedelta(days=TICKETS_AHEAD_DAYS)).strftime("%Y-%m-%d")
+    conn = connect(DB_PATH)
+    rows = conn.execute(
+        """
+        SELECT event_id FROM events
+        WHERE is_deleted = 0
+          AND date(event_date) >= date('now')
+          AND date(event_date) <= date(?)
+        """,
+        (until,),
+    ).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+# --- QR-картинки ---
+
+def render_qr_png(data: str) -> bytes:
+    # Выполняется в отдельном процессе пула
+    buffer = io.BytesIO()
+    qrcode.make(data).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=TICKETS_WORKERS)
+    return _pool
+
+
+async def render_ticket_images(event_id: int, tokens: list[str], bot_username: str) -> int:
+    missing = [token for token in tokens if not get_ticket_image_path(event_id, token).exists()]
+    if not missing or not qr_available():
+        return 0
+
+    loop = asyncio.get_running_loop()
+    images = await asyncio.gather(*(
+        loop.run_in_executor(get_pool(), render_qr_png, get_checkin_link(bot_username, token))
+        for token in missing
+    ))
+    (TICKETS_DIR / str(event_id)).mkdir(parents=True, exist_ok=True)
+    for token, image in zip(missing, images):
+        get_ticket_image_path(event_id, token).write_bytes(image)
+    return len(missing)
+
+
+async def prepare_event_tickets(bot: Bot, event_id: int) -> int:
+    tickets = issue_event_tickets(event_id)
+    me = await bot.me()
+    return await render_ticket_images(event_id, [token for token, _, _ in tickets], me.username)
+
+
+async def tickets_loop(bot: Bot):
+    # Билеты на ближайшие ивенты готовим заранее, пачкой, чтобы у входа не ждать генерации
+    while True:
+        try:
+            for event_id in get_upcoming_event_ids():
+                rendered = await prepare_event_tickets(bot, event_id)
+                if rendered:
+                    logging.info("Сгенерировано QR-билетов для ивента %s: %s", event_id, rendered)
+        except Exception:
+            logging.exception("Ошибка при подготовке билетов")
+        await asyncio.sleep(TICKETS_CHECK_INTERVAL_SECONDS)
+
+
+# --- Хендлеры ---
+
+@router.callback_query(lambda c: c.data.startswith("user_ticket:"))
+async def user_ticket(call: CallbackQuery):
+    event_id = int(call.data.split(":")[1])
+    ticket = get_user_ticket(event_id, call.from_user.id)
+    if ticket is None:
+        await call.answer("Билет есть только у записавшихся", show_alert=True)
+        return
+
+    token, file_id = ticket
+    me = await call.bot.me()
+    link = get_checkin_link(me.username, token)
+    caption = "🎟 Твой билет. Покажи QR-код на входе."
+
+    if file_id:
+        await call.message.answer_photo(file_id, caption=caption)
+    elif qr_available():
+        image_path = get_ticket_image_path(event_id, token)
+        if not image_path.exists():
+            await render_ticket_images(event_id, [token], me.username)
+        sent = await call.message.answer_photo(FSInputFile(image_path), caption=caption)
+        set_ticket_file_id(token, sent.photo[-1].file_id)
+    else:
+        await call.message.answer(f"{caption}\n\nИли назови код: <code>{token}</code>\n{link}", parse_mode="HTML")
+    await call.answer()
+
+
+async def handle_checkin(message: Message, token: str):
+    row, first_time = check_in_ticket(token, message.from_user.id)
+    if row is None:
+        await message.answer("❌ Билет не найден или ивент отменён.")
+        return
+
+    user_name, user_nickname, checked_in_at, event_name, event_date = row
+    who = f"{user_name} (@{user_nickname})" if user_nickname else user_name
+    if first_time:
+        await message.answer(f"✅ {who}\n🎬 {event_name}, {event_date}")
+    else:
+        await message.answer(f"⚠️ {who} уже отмечен(а) в {checked_in_at[11:16]}\n🎬 {event_name}, {event_date}")
+
@@ -1,4 +1,4 @@
-import sqlite3
+import tempfile
 from pathlib import Path
 from datetime import datetime
 
@@ -6,7 +6,6 @@ from aiogram import Router
 from aiogram.types import (
     Message,
     InlineKeyboardMarkup,
-    InlineKeyboardButton,
     CallbackQuery,
     BufferedInputFile,
     FSInputFile,
@@ -14,12 +13,21 @@ from aiogram.types import (
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
+from event_catalog import catalog, load_event
+from export_utils import write_participants_csv, write_participants_xlsx, xlsx_available
 from ics_utils import build_event_ics
-DB_PATH = Path(__file__).resolve().parent / "data.db"
-PICS_DIR = Path(__file__).resolve().parent / "pics"
+from keyboards import KeyboardTemplate
+from live_cards import mark_event_changed
+from query_log import connect
+from tenants import ADMINS, TenantPath
+DB_PATH = TenantPath("data.db")
+PICS_DIR = TenantPath("pics")
 router = Router()
 
 DASH_SYMBOLS = {"-", "—", "–", "−", "‑"}
+# Больше участников — список уходит файлом, а не текстом
+INLINE_PARTICIPANTS_LIMIT = 50
+TELEGRAM_TEXT_LIMIT = 4096
 
 EDIT_FIELDS = {
     "name": ("Название", "name"),
@@ -47,37 +55,32 @@ class EditEventState(StatesGroup):
 # --------------------------------------------------
 
 def get_future_events():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT event_id, name, description, price, address,
-               max_participants, event_date, event_time
-        FROM events
-        WHERE is_deleted = 0
-          AND date(event_date) >= date('now')
-        ORDER BY event_date, event_time
-    """)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    return catalog.future_events()
 
 
 def get_event(event_id: int):
-    conn = sqlite3.connect(DB_PATH)
+    return catalog.get(event_id) or load_event(event_id)
+
+
+def get_event_series_id(event_id: int) -> int | None:
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT event_id, name, description, price, address,
-               max_participants, event_date, event_time
-        FROM events
-        WHERE event_id = ? AND is_deleted = 0
-    """, (event_id,))
+    # Остановленная серия не считается: ни кнопок серии, ни запрета создать новую
+    cursor.execute(
+        """
+        SELECT e.series_id FROM events e
+        JOIN event_series s ON s.series_id = e.series_id
+        WHERE e.event_id = ? AND s.is_active = 1
+        """,
+        (event_id,),
+    )
     row = cursor.fetchone()
     conn.close()
-    return row
+    return row[0] if row else None
 
 
 def update_event_field(event_id: int, field: str, value):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         f"UPDATE events SET {field} = ? WHERE event_id = ?",
@@ -85,10 +88,11 @@ def update_event_field(event_id: int, field: str, value):
     )
     conn.commit()
     conn.close()
+    catalog.refresh(event_id)
 
 
 def mark_event_deleted(event_id: int):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "UPDATE events SET is_deleted = 1 WHERE event_id = ?",
@@ -96,23 +100,41 @@ def mark_event_deleted(event_id: int):
     )
     conn.commit()
     conn.close()
+    catalog.remove(event_id)
 
 
 def get_event_participants(event_id: int):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
-        SELECT user_name, user_nickname
-        FROM registrations
-        WHERE event_id = ?
+        SELECT r.user_name, r.user_nickname, t.checked_in_at
+        FROM registrations r
+        LEFT JOIN tickets t ON t.event_id = r.event_id AND t.user_id = r.user_id
+        WHERE r.event_id = ?
     """, (event_id,))
     rows = cursor.fetchall()
     conn.close()
     return rows
 
 
+def iter_event_participants(event_id: int):
+    # Отдаём строки прямо из курсора, не загружая всех участников в память
+    conn = connect(DB_PATH)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.user_name, r.user_nickname, r.user_id, t.checked_in_at
+            FROM registrations r
+            LEFT JOIN tickets t ON t.event_id = r.event_id AND t.user_id = r.user_id
+            WHERE r.event_id = ?
+        """, (event_id,))
+        yield from cursor
+    finally:
+        conn.close()
+
+
 def count_event_registrations(event_id: int) -> int:
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT COUNT(*) FROM registrations WHERE event_id = ?",
@@ -164,40 +186,85 @@ async def update_event_poster(message: Message, event_id: int) -> bool:
 # Клавиатуры
 # --------------------------------------------------
 
+# Клавиатуры собираются один раз, при показе подставляется только event_id
+EVENT_MAIN_KB = KeyboardTemplate([
+    [("✏️ Редактировать", "event_edit:{event_id}")],
+    [("👥 Просмотреть участников", "event_users:{event_id}")],
+    [("📅 Добавить в календарь (.ics)", "event_ics:{event_id}")],
+    [("🗑 Удалить", "event_delete:{event_id}")],
+])
+
+EVENT_EDIT_ROWS = [
+    [("← Назад", "event_back:{event_id}")],
+    [("🎬 Название", "event_edit_name:{event_id}")],
+    [("📝 Описание", "event_edit_description:{event_id}")],
+    [("💰 Цена", "event_edit_price:{event_id}")],
+    [("🏠 Адрес", "event_edit_address:{event_id}")],
+    [("👥 Макс. участников", "event_edit_max:{event_id}")],
+    [("📅 Дата", "event_edit_date:{event_id}")],
+    [("⏰ Время", "event_edit_time:{event_id}")],
+    [("🖼 Афиша", "event_edit_poster:{event_id}")],
+]
+EVENT_EDIT_KB = KeyboardTemplate([*EVENT_EDIT_ROWS, [("🔁 Повторять еженедельно", "series_make:{event_id}")]])
+EVENT_EDIT_SERIES_KB = KeyboardTemplate([*EVENT_EDIT_ROWS, [("⏹ Остановить серию", "series_stop:{event_id}")]])
+
+SERIES_APPLY_KB = KeyboardTemplate([
+    [("🔁 Применить ко всей серии", "series_apply:{event_id}:{field_key}")],
+])
+
+PARTICIPANTS_EXPORT_KB = KeyboardTemplate([[
+    ("📄 CSV", "event_export:{event_id}:csv"),
+    *([("📊 XLSX", "event_export:{event_id}:xlsx")] if xlsx_available() else []),
+]])
+
+DELETE_CONFIRM_KB = KeyboardTemplate([
+    [("✅ Да", "event_delete_yes:{event_id}")],
+    [("❌ Нет", "event_delete_no:{event_id}")],
+])
+
+
 def event_main_kb(event_id: int):
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"event_edit:{event_id}")],
-        [InlineKeyboardButton(text="👥 Просмотреть участников", callback_data=f"event_users:{event_id}")],
-        [InlineKeyboardButton(text="📅 Добавить в календарь (.ics)", callback_data=f"event_ics:{event_id}")],
-        [InlineKeyboardButton(text="🗑 Удалить", callback_data=f"event_delete:{event_id}")]
-    ])
-
-
-def event_edit_kb(event_id: int):
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="← Назад", callback_data=f"event_back:{event_id}")],
-        [InlineKeyboardButton(text="🎬 Название", callback_data=f"event_edit_name:{event_id}")],
-        [InlineKeyboardButton(text="📝 Описание", callback_data=f"event_edit_description:{event_id}")],
-        [InlineKeyboardButton(text="💰 Цена", callback_data=f"event_edit_price:{event_id}")],
-        [InlineKeyboardButton(text="🏠 Адрес", callback_data=f"event_edit_address:{event_id}")],
-        [InlineKeyboardButton(text="👥 Макс. участников", callback_data=f"event_edit_max:{event_id}")],
-        [InlineKeyboardButton(text="📅 Дата", callback_data=f"event_edit_date:{event_id}")],
-        [InlineKeyboardButton(text="⏰ Время", callback_data=f"event_edit_time:{event_id}")],
-        [InlineKeyboardButton(text="🖼 Афиша", callback_data=f"event_edit_poster:{event_id}")]
-    ])
+    return EVENT_MAIN_KB.render(event_id=event_id)
+
+
+def event_edit_kb(event_id: int, in_series: bool = False):
+    template = EVENT_EDIT_SERIES_KB if in_series else EVENT_EDIT_KB
+    return template.render(event_id=event_id)
+
+
+def series_apply_kb(event_id: int, field_key: str):
+    return SERIES_APPLY_KB.render(event_id=event_id, field_key=field_key)
+
+
+def participants_export_kb(event_id: int):
+    return PARTICIPANTS_EXPORT_KB.render(event_id=event_id)
 
 
 def delete_confirm_kb(event_id: int):
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="✅ Да", callback_data=f"event_delete_yes:{event_id}")],
-        [InlineKeyboardButton(text="❌ Нет", callback_data=f"event_delete_no:{event_id}")]
-    ])
+    return DELETE_CONFIRM_KB.render(event_id=event_id)
 
 
 # --------------------------------------------------
 # Показ списка будущих ивентов
 # --------------------------------------------------
 
+def build_admin_event_text(event_row) -> str:
+    event_id, name, desc, price, address, max_p, date, time = event_row
+    registered_count = count_event_registrations(event_id)
+    participants_line = f"👥 Участников {registered_count}/{max_p}"
+    if registered_count >= max_p:
+        participants_line += " — солдаут!"
+
+    return (
+        f"🎬 <b>{name}</b>\n"
+        f"📝 {desc}\n\n"
+        f"💰 Цена: {price}\n"
+        f"🏠 Адрес: {address}\n"
+        f"{participants_line}\n"
+        f"📅 {date} ⏰ {time}"
+    )
+
+
 async def show_future_events(message: Message):
     events = get_future_events()
 
@@ -206,21 +273,7 @@ async def show_future_events(message: Message):
         return
 
     for e in events:
-        event_id, name, desc, price, address, max_p, date, time = e
-        registered_count = count_event_registrations(event_id)
-        participants_line = f"👥 Участников {registered_count}/{max_p}"
-        if registered_count >= max_p:
-            participants_line += " — солдаут!"
-
-        text = (
-            f"🎬 <b>{name}</b>\n"
-            f"📝 {desc}\n\n"
-            f"💰 Цена: {price}\n"
-            f"🏠 Адрес: {address}\n"
-            f"{participants_line}\n"
-            f"📅 {date} ⏰ {time}"
-        )
-        await send_event_info(message, text, event_id, event_main_kb(event_id))
+        await send_event_info(message, build_admin_event_text(e), e[0], event_main_kb(e[0]))
 
 
 # --------------------------------------------------
@@ -231,7 +284,7 @@ async def show_future_events(message: Message):
 async def event_edit(call: CallbackQuery):
     event_id = int(call.data.split(":")[1])
     await call.message.edit_reply_markup(
-        reply_markup=event_edit_kb(event_id)
+        reply_markup=event_edit_kb(event_id, in_series=get_event_series_id(event_id) is not None)
     )
 
 
@@ -244,18 +297,54 @@ async def event_back(call: CallbackQuery):
 
 
 
+async def send_participants_file(message: Message, event_id: int, file_format: str):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / f"event_{event_id}_participants.{file_format}"
+        if file_format == "xlsx":
+            count = write_participants_xlsx(iter_event_participants(event_id), path)
+        else:
+            count = write_participants_csv(iter_event_participants(event_id), path)
+        await message.answer_document(FSInputFile(path), caption=f"👥 Участников: {count}")
+
+
 @router.callback_query(lambda c: c.data.startswith("event_users:"))
 async def event_users(call: CallbackQuery):
+    if call.from_user.id not in ADMINS:
+        return
+
     event_id = int(call.data.split(":")[1])
-    users = get_event_participants(event_id)
+    registered_count = count_event_registrations(event_id)
 
-    if not users:
-        text = "👥 Участников пока нет."
-    else:
-        lines = [f"• {u[0]} ({u[1]})" for u in users]
+    if not registered_count:
+        await call.message.answer("👥 Участников пока нет.")
+        await call.answer()
+        return
+
+    if registered_count <= INLINE_PARTICIPANTS_LIMIT:
+        users = get_event_participants(event_id)
+        lines = [f"{'✅' if u[2] else '•'} {u[0]} ({u[1]})" for u in users]
         text = "👥 Участники:\n" + "\n".join(lines)
+        if len(text) <= TELEGRAM_TEXT_LIMIT:
+            await call.message.answer(text, reply_markup=participants_export_kb(event_id))
+            await call.answer()
+            return
+
+    await send_participants_file(call.message, event_id, "csv")
+    await call.answer()
+
+
+@router.callback_query(lambda c: c.data.startswith("event_export:"))
+async def event_export(call: CallbackQuery):
+    if call.from_user.id not in ADMINS:
+        return
 
-    await call.message.answer(text)
+    _, event_id, file_format = call.data.split(":")
+    if file_format == "xlsx" and not xlsx_available():
+        await call.answer("XLSX недоступен, установите openpyxl", show_alert=True)
+        return
+
+    await send_participants_file(call.message, int(event_id), file_format)
+    await call.answer()
 
 
 @router.callback_query(lambda c: c.data.startswith("event_delete:"))
@@ -319,6 +408,15 @@ async def start_edit_field(call: CallbackQuery, state: FSMContext):
         await call.message.answer(f"✏️ Введите новое значение для поля «{label}»:")
 
 
+async def offer_series_apply(message: Message, event_id: int, field_key: str):
+    if get_event_series_id(event_id) is None:
+        return
+    await message.answer(
+        "Ивент входит в серию. Применить изменение ко всем будущим ивентам серии?",
+        reply_markup=series_apply_kb(event_id, field_key),
+    )
+
+
 @router.message(EditEventState.value)
 async def apply_edit(message: Message, state: FSMContext):
     data = await state.get_data()
@@ -329,6 +427,7 @@ async def apply_edit(message: Message, state: FSMContext):
     if field_key == "poster":
         if await update_event_poster(message, event_id):
             await state.clear()
+            await offer_series_apply(message, event_id, field_key)
         return
 
     value = message.text.strip()
@@ -362,6 +461,10 @@ async def apply_edit(message: Message, state: FSMContext):
         return
 
     update_event_field(event_id, field, value)
+    # Карточки этого ивента, уже отправленные участникам, перерисуются
+    mark_event_changed(message.bot, event_id)
 
     await message.answer("✅ Значение обновлено.")
     await state.clear()
+    if field_key != "date":
+        await offer_series_apply(message, event_id, field_key)